@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable
+
+import numpy as np
+from flask import Response, request
+
+COLUMNAR_MIMETYPE = 'application/vnd.stocksense.columnar+json'
+# Responses smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+
+
+def wants_columnar() -> bool:
+    """True if the client asked for the compact format (?format=columnar or the Accept header)."""
+    if request.args.get('format') == 'columnar':
+        return True
+    return request.accept_mimetypes[COLUMNAR_MIMETYPE] > request.accept_mimetypes['application/json']
+
+
+def encode_series(days: np.ndarray, values: np.ndarray, decimals: int = 4) -> Dict[str, Any]:
+    """Compact form of a dated series: day offsets from `base_day` plus delta-encoded values.
+
+    Values are fixed-point integers at `scale`; decode with
+    dates = base_day + days (epoch days) and values = cumsum(deltas) / scale.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    scale = 10 ** decimals
+    base_day = int(days[0]) if len(days) else 0
+    return {
+        'base_day': base_day,
+        'days': (days - base_day).tolist(),
+        'scale': scale,
+        'deltas': encode_deltas(values, scale),
+    }
+
+
+def encode_deltas(values: np.ndarray, scale: int = 1) -> list:
+    """Fixed-point deltas of one more column of a series; decode with cumsum(deltas) / scale."""
+    fixed = np.rint(np.asarray(values, dtype=float) * scale).astype(np.int64)
+    return np.diff(fixed, prepend=0).tolist()
+
+
+def points_to_columns(points: Iterable[Dict[str, Any]]):
+    """[{'x': 'YYYY-MM-DD', 'y': float}, ...] -> (epoch days, values) arrays."""
+    points = list(points)
+    days = np.array([p['x'] for p in points], dtype='datetime64[D]').astype(np.int64)
+    return days, np.array([p['y'] for p in points], dtype=float)
+
+
+def day_to_datetime(day: int) -> datetime:
+    return datetime.fromtimestamp(int(day) * 86400, tz=timezone.utc)
+
+
+def make_etag(*parts: Any) -> str:
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()[:20]
+
+
+def client_is_fresh(etag: str, last_modified: datetime) -> bool:
+    """True if the client's cached copy matches (If-None-Match wins over If-Modified-Since)."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    return request.if_modified_since is not None and last_modified <= request.if_modified_since
+
+
+def not_modified(etag: str, last_modified: datetime) -> Response:
+    return _validators(Response(status=304), etag, last_modified)
+
+
+def conditional_json(build: Callable[[], Dict[str, Any]], etag: str, last_modified: datetime,
+                     mimetype: str = 'application/json') -> Response:
+    """JSON response that revalidates with ETag/Last-Modified and is gzipped when large.
+
+    `build` only runs when the client's copy is stale, so a 304 skips serialization.
+    """
+    if client_is_fresh(etag, last_modified):
+        return not_modified(etag, last_modified)
+
+    body = json.dumps(build(), separators=(',', ':')).encode()
+    response = Response(body, mimetype=mimetype)
+    if len(body) >= GZIP_MIN_BYTES and 'gzip' in request.accept_encodings:
+        response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+        response.headers['Content-Encoding'] = 'gzip'
+    return _validators(response, etag, last_modified)
+
+
+def _validators(response: Response, etag: str, last_modified: datetime) -> Response:
+    # Weak, because the gzipped and plain bodies share the tag
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    response.vary.add('Accept')
+    response.vary.add('Accept-Encoding')
+    return response
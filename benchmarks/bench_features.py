@@ -0,0 +1,123 @@
+"""
+Time the NumPy feature engine against the original pandas indicators, offline.
+
+Synthetic daily histories, some with NaN closes like the ones yfinance emits, go through
+both `features.features_from_history` and the pandas code it replaced; the frames must
+keep the same rows and agree to 1e-9, so both slowdowns and parity breaks show up.
+
+Usage:
+    python benchmarks/bench_features.py [--repeat 50] [--max-ms 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from features import FEATURES, features_from_history  # noqa: E402
+
+# (case name, bars, rows whose close is NaN)
+CASES = [
+    ('clean', 250, []),
+    ('clean_5y', 1250, []),
+    ('nan_mid', 400, [200]),
+    ('nan_run', 400, [100, 101, 102, 300]),
+    ('nan_leading', 400, [0, 3]),
+    ('nan_last', 400, [399]),
+]
+
+
+def make_history(bars: int, nan_rows, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, bars)))
+    df = pd.DataFrame({
+        'Open': close * (1 + rng.normal(0, 0.005, bars)),
+        'High': close * 1.01,
+        'Low': close * 0.99,
+        'Close': close,
+        'Volume': rng.integers(100_000, 5_000_000, bars).astype(float),
+    }, index=pd.bdate_range('2020-01-01', periods=bars))
+    df.iloc[nan_rows, df.columns.get_loc('Close')] = np.nan
+    return df
+
+
+def pandas_features(df: pd.DataFrame) -> pd.DataFrame:
+    """The indicator code `features.compute_feature_matrix` replaced."""
+    df = df.copy()
+    df['Daily_Return'] = df['Close'].pct_change()
+    df['Log_Return'] = np.log1p(df['Daily_Return'])
+    df['MA10'] = df['Close'].rolling(10).mean()
+    df['MA20'] = df['Close'].rolling(20).mean()
+    df['MA50'] = df['Close'].rolling(50).mean()
+    df['EMA10'] = df['Close'].ewm(span=10, adjust=False).mean()
+    df['EMA20'] = df['Close'].ewm(span=20, adjust=False).mean()
+    df['Volatility'] = df['Daily_Return'].rolling(20).std()
+
+    delta = df['Close'].diff()
+    gain = delta.where(delta > 0, 0).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    df['RSI'] = 100 - (100 / (1 + gain / loss))
+
+    exp1 = df['Close'].ewm(span=12, adjust=False).mean()
+    exp2 = df['Close'].ewm(span=26, adjust=False).mean()
+    df['MACD'] = exp1 - exp2
+    df['Signal_Line'] = df['MACD'].ewm(span=9, adjust=False).mean()
+
+    df['BB_Middle'] = df['Close'].rolling(window=20).mean()
+    std = df['Close'].rolling(window=20).std()
+    df['BB_Upper'] = df['BB_Middle'] + (std * 2)
+    df['BB_Lower'] = df['BB_Middle'] - (std * 2)
+
+    if 'Adj Close' not in df.columns:
+        df['Adj Close'] = df['Close']
+    return df.dropna()[FEATURES]
+
+
+def time_ms(fn, arg, repeat: int) -> float:
+    """Median wall time of `fn(arg)` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=50, help='runs per case')
+    parser.add_argument('--max-ms', type=float, default=None, help='fail if any median exceeds this')
+    args = parser.parse_args()
+    # pct_change's fill_method default is deprecated; the rows it affects are dropped anyway
+    warnings.simplefilter('ignore', FutureWarning)
+
+    failures = []
+    print(f"{'case':14} {'bars':>6} {'rows':>6} {'numpy ms':>9} {'pandas ms':>10}")
+    for name, bars, nan_rows in CASES:
+        df = make_history(bars, nan_rows)
+        ours, reference = features_from_history(df), pandas_features(df)
+        if not ours.index.equals(reference.index):
+            failures.append(f'{name}: kept {len(ours)} rows, pandas keeps {len(reference)}')
+        elif not np.allclose(ours.to_numpy(), reference.to_numpy(), rtol=1e-9, atol=1e-9):
+            failures.append(f'{name}: feature values differ from pandas')
+
+        ms = time_ms(features_from_history, df, args.repeat)
+        print(f'{name:14} {bars:6} {len(ours):6} {ms:9.2f} {time_ms(pandas_features, df, args.repeat):10.2f}')
+        if args.max_ms is not None and ms > args.max_ms:
+            failures.append(f'{name}: {ms:.2f} ms is over the {args.max_ms} ms limit')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Time the movers table parsers against saved pages, offline.
+
+Each parser runs over its HTML fixtures in benchmarks/fixtures/ and its records are
+checked against expected.json, so both slowdowns and parsing changes show up.
+
+Usage:
+    python benchmarks/bench_parsers.py [--repeat 50] [--max-ms 5] [--baseline]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+sys.path.insert(0, ROOT)
+
+import movers_sources  # noqa: E402
+
+# (parser name, parser, fixtures it reads)
+CASES = [
+    ('parse_screener_rows', movers_sources.parse_screener_rows, ['screener_gainers', 'screener_losers']),
+    ('parse_moneycontrol_rows', movers_sources.parse_moneycontrol_rows, ['moneycontrol_gainers', 'moneycontrol_losers']),
+    ('parse_investing_rows', movers_sources.parse_investing_rows, ['investing_gainers', 'investing_losers']),
+    ('parse_screener_tables', movers_sources.parse_screener_tables, ['screener_gainers_losers']),
+]
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, f'{name}.html'), encoding='utf-8') as f:
+        return f.read()
+
+
+def time_ms(fn, arg, repeat: int) -> float:
+    """Median wall time of `fn(arg)` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=50, help='runs per fixture')
+    parser.add_argument('--max-ms', type=float, default=None, help='fail if any median exceeds this')
+    parser.add_argument('--baseline', action='store_true',
+                        help="also time a full BeautifulSoup 'html.parser' parse of each page")
+    args = parser.parse_args()
+
+    with open(os.path.join(FIXTURES, 'expected.json'), encoding='utf-8') as f:
+        expected = json.load(f)
+
+    failures = []
+    print(f"{'parser':26} {'fixture':26} {'KB':>6} {'median ms':>10}" + (f" {'bs4 ms':>8}" if args.baseline else ''))
+    for name, fn, fixtures in CASES:
+        for fixture in fixtures:
+            html = load_fixture(fixture)
+            key = f'{name}:{fixture}'
+            # Round-trip through JSON so tuples compare equal to the stored lists
+            if json.loads(json.dumps(fn(html))) != expected.get(key):
+                failures.append(f'{key}: records differ from expected.json')
+
+            ms = time_ms(fn, html, args.repeat)
+            line = f'{name:26} {fixture:26} {len(html) / 1024:6.0f} {ms:10.2f}'
+            if args.baseline:
+                from bs4 import BeautifulSoup
+                line += f" {time_ms(lambda page: BeautifulSoup(page, 'html.parser'), html, args.repeat):8.2f}"
+            print(line)
+            if args.max_ms is not None and ms > args.max_ms:
+                failures.append(f'{key}: {ms:.2f} ms is over the {args.max_ms} ms limit')
+
+    for failure in failures:
+        print(f'FAIL {failure}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,241 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+# 'memory' keeps each worker's cache private; 'sqlite' shares one file between all workers on the host
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+CACHE_PATH = os.getenv('CACHE_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'cache.sqlite3')
+
+
+class CacheBackend(ABC):
+    """Key/value cache with per-entry TTLs. Values must be JSON-serializable."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Set `key` only if it is absent or expired; True if this call stored it."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def delete_if(self, key: str, value: Any) -> bool:
+        """Delete `key` only if it still holds `value`; True if this call deleted it.
+
+        Releases a lock taken with `add` without removing one another worker took after it expired.
+        """
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU bounded by entry count."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._live(key)
+            return None if entry is None else entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + ttl if ttl else None, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            if self._live(key) is not None:
+                return False
+            self._entries[key] = (time.time() + ttl if ttl else None, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_if(self, key: str, value: Any) -> bool:
+        with self._lock:
+            entry = self._live(key)
+            if entry is None or entry[1] != value:
+                return False
+            del self._entries[key]
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'backend': 'memory', 'entries': len(self._entries), 'max_entries': self.max_entries}
+
+
+class SQLiteCache(CacheBackend):
+    """Cache in a local SQLite file (WAL mode), shared by every process on the host.
+
+    Least recently written entries beyond `max_entries` are dropped.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with self._conn() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS cache ('
+                         'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL, updated REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_updated ON cache (updated)')
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn().execute(
+            'SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        self._conn().execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires, updated) VALUES (?, ?, ?, ?)',
+            (key, json.dumps(value), now + ttl if ttl else None, now)
+        )
+        self._maybe_prune()
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        now = time.time()
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM cache WHERE key = ? AND expires IS NOT NULL AND expires <= ?', (key, now))
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires, updated) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), now + ttl if ttl else None, now)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return cursor.rowcount == 1
+
+    def delete(self, key: str) -> None:
+        self._conn().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_if(self, key: str, value: Any) -> bool:
+        cursor = self._conn().execute('DELETE FROM cache WHERE key = ? AND value = ?', (key, json.dumps(value)))
+        return cursor.rowcount == 1
+
+    def _maybe_prune(self) -> None:
+        self._writes += 1
+        if self._writes % 100:
+            return
+        conn = self._conn()
+        try:
+            conn.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (time.time(),))
+            conn.execute('DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY updated DESC LIMIT -1 OFFSET ?)',
+                         (self.max_entries,))
+        except sqlite3.OperationalError as e:
+            logging.warning(f'Cache prune skipped: {e}')
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._conn().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        return {'backend': 'sqlite', 'path': self.path, 'entries': entries, 'max_entries': self.max_entries}
+
+
+class NamespacedCache(CacheBackend):
+    """Prefixes keys so several caches can share one backend."""
+
+    def __init__(self, backend: CacheBackend, namespace: str):
+        self.backend = backend
+        self.prefix = f'{namespace}:'
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.backend.get(self.prefix + key)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.backend.set(self.prefix + key, value, ttl)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        return self.backend.add(self.prefix + key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        self.backend.delete(self.prefix + key)
+
+    def delete_if(self, key: str, value: Any) -> bool:
+        return self.backend.delete_if(self.prefix + key, value)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.backend.stats()
+
+
+@contextmanager
+def cache_lock(cache: CacheBackend, key: str, ttl: float) -> Iterator[bool]:
+    """Take `key` in `cache` as a lock expiring after `ttl` seconds; yields whether it was taken.
+
+    With a shared backend this excludes every worker on the host. The token is unique per
+    holder, so releasing never drops a lock another worker took after this one expired.
+    """
+    token = f'{os.getpid()}:{uuid.uuid4().hex}'
+    acquired = cache.add(key, token, ttl)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cache.delete_if(key, token)
+
+
+_shared: Optional[CacheBackend] = None
+_shared_lock = threading.Lock()
+
+
+def get_cache(namespace: str, max_entries: int = 1024) -> CacheBackend:
+    """Cache for `namespace` on the configured backend (see CACHE_BACKEND)."""
+    global _shared
+    if CACHE_BACKEND == 'sqlite':
+        with _shared_lock:
+            if _shared is None:
+                _shared = SQLiteCache(CACHE_PATH)
+        return NamespacedCache(_shared, namespace)
+    if CACHE_BACKEND != 'memory':
+        logging.warning(f'Unknown CACHE_BACKEND {CACHE_BACKEND!r}; using in-process memory cache')
+    return MemoryCache(max_entries)
@@ -0,0 +1,35 @@
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the points Largest-Triangle-Three-Buckets keeps to draw (x, y) with `n_out` points.
+
+    The first and last points are always kept. Each bucket in between keeps the point
+    forming the largest triangle with the previously kept point and the next bucket's
+    average, which preserves peaks and troughs that plain striding would drop.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    buckets = n_out - 2
+    # Bucket i spans [bounds[i], bounds[i + 1]); integer maths keeps the last bound exactly n - 1
+    bounds = np.arange(buckets + 2) * (n - 2) // buckets + 1
+    bounds[-1] = n
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    a = 0
+    for i in range(buckets):
+        start, end = bounds[i], bounds[i + 1]
+        next_end = bounds[i + 2]
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        keep[i + 1] = a
+    return keep
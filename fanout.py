@@ -0,0 +1,31 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Shared by all scrapers; stragglers that miss their deadline finish here without blocking callers
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='fanout')
+
+
+def run_concurrently(tasks: Dict[Hashable, Callable[[], Any]], budget: float,
+                     deadlines: Optional[Dict[Hashable, float]] = None) -> Dict[Hashable, Any]:
+    """Run all `tasks` at once and return the results of those that finish in time.
+
+    Each task gets its own deadline (seconds, default `budget`), capped by the overall
+    `budget`. Tasks that fail or miss their deadline are logged and left out of the result.
+    """
+    start = time.monotonic()
+    futures = {key: _executor.submit(fn) for key, fn in tasks.items()}
+    deadlines = deadlines or {}
+
+    results = {}
+    for key, future in futures.items():
+        deadline = start + min(deadlines.get(key, budget), budget)
+        try:
+            results[key] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except TimeoutError:
+            future.cancel()
+            logging.warning(f'{key} missed its deadline after {time.monotonic() - start:.1f}s; skipping')
+        except Exception as e:
+            logging.error(f'{key} failed: {e}')
+    return results
@@ -0,0 +1,190 @@
+import math
+from typing import Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+import logging
+import requests
+from history_store import history_store
+from upstream import CircuitOpen
+
+# Column order expected by scaler_X (see model/model2.ipynb)
+FEATURES = [
+    'Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume',
+    'Daily_Return', 'Log_Return', 'MA10', 'MA20', 'MA50',
+    'EMA10', 'EMA20', 'Volatility', 'RSI',
+    'MACD', 'Signal_Line', 'BB_Middle', 'BB_Upper', 'BB_Lower'
+]
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURES)}
+TIME_STEP = 60
+
+
+def _rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1:] = sliding_window_view(x, window).mean(axis=1)
+    return out
+
+
+def _rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1:] = sliding_window_view(x, window).std(axis=1, ddof=1)
+    return out
+
+
+# Smoothing factors of EMA10, EMA20, EMA12, EMA26 and the MACD signal line
+_ALPHAS = (2 / 11, 2 / 21, 2 / 13, 2 / 27)
+_SIGNAL_ALPHA = 2 / 10
+
+
+def _ewm_resume(weighted: float, value: float, alpha: float, gap: int) -> float:
+    """pandas' `adjust=False` update for an observation that follows `gap` NaN rows."""
+    old = 1.0
+    for _ in range(gap + 1):
+        old *= 1 - alpha
+    return (old * weighted + alpha * value) / (old + alpha)
+
+
+def _ewm_steps(close: np.ndarray) -> Iterator[Tuple[float, float, float, float, float]]:
+    """(EMA10, EMA20, EMA12, EMA26, Signal_Line) after each close, as pandas `ewm(adjust=False)`.
+
+    Like pandas (`ignore_na=False`), a NaN close holds every average where it was and the
+    next real close is weighted against the decay of the skipped rows, so one bad bar does
+    not turn the averages NaN for the rest of the history.
+    """
+    a10, a20, a12, a26 = _ALPHAS
+    e10 = e20 = e12 = e26 = s9 = math.nan
+    gap = 0
+    for c in close.tolist():
+        if c != c:
+            if e10 == e10:
+                gap += 1
+        elif e10 != e10:
+            # First real close seeds every average; the signal line starts at MACD = 0
+            e10 = e20 = e12 = e26 = c
+            s9 = 0.0
+            gap = 0
+            yield e10, e20, e12, e26, s9
+            continue
+        elif gap:
+            e10 = _ewm_resume(e10, c, a10, gap)
+            e20 = _ewm_resume(e20, c, a20, gap)
+            e12 = _ewm_resume(e12, c, a12, gap)
+            e26 = _ewm_resume(e26, c, a26, gap)
+            gap = 0
+        else:
+            e10 += a10 * (c - e10)
+            e20 += a20 * (c - e20)
+            e12 += a12 * (c - e12)
+            e26 += a26 * (c - e26)
+        # MACD is defined on NaN-close rows too, so the signal line never skips
+        if s9 == s9:
+            s9 += _SIGNAL_ALPHA * ((e12 - e26) - s9)
+        yield e10, e20, e12, e26, s9
+
+
+def ewm_state(close: np.ndarray) -> Tuple[float, float, float, float, float]:
+    """The (EMA10, EMA20, EMA12, EMA26, Signal_Line) state after the last of `close`."""
+    state = (math.nan,) * 5
+    for state in _ewm_steps(np.asarray(close, dtype=np.float64)):
+        pass
+    return state
+
+
+def _ewm_columns(close: np.ndarray):
+    """EMA10, EMA20, MACD and Signal_Line (pandas `ewm(adjust=False)`) in one pass."""
+    steps = np.array(list(_ewm_steps(close)), dtype=np.float64).reshape(-1, 5)
+    return steps[:, 0], steps[:, 1], steps[:, 2] - steps[:, 3], steps[:, 4]
+
+
+def compute_feature_matrix(open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                           volume: np.ndarray, adj_close: np.ndarray = None) -> np.ndarray:
+    """Build the `(n, 20)` model feature matrix from raw OHLCV arrays.
+
+    Columns follow `FEATURES`. Rows whose indicators are still warming up contain NaN,
+    exactly where the pandas rolling/ewm implementation would.
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    n = len(close)
+    if n == 0:
+        return np.empty((0, len(FEATURES)))
+
+    out = np.empty((n, len(FEATURES)))
+    out[:, 0] = open_
+    out[:, 1] = high
+    out[:, 2] = low
+    out[:, 3] = close
+    out[:, 4] = close if adj_close is None else adj_close
+    out[:, 5] = volume
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = np.empty(n)
+        delta[0] = np.nan
+        delta[1:] = close[1:] - close[:-1]
+
+        daily_return = np.empty(n)
+        daily_return[0] = np.nan
+        daily_return[1:] = close[1:] / close[:-1] - 1
+        out[:, 6] = daily_return
+        out[:, 7] = np.log1p(daily_return)
+
+        ma20 = _rolling_mean(close, 20)
+        out[:, 8] = _rolling_mean(close, 10)
+        out[:, 9] = ma20
+        out[:, 10] = _rolling_mean(close, 50)
+
+        ema10, ema20, macd, signal = _ewm_columns(close)
+        out[:, 11] = ema10
+        out[:, 12] = ema20
+        out[:, 13] = _rolling_std(daily_return, 20)
+
+        # RSI; the leading NaN delta counts as no gain and no loss, like `Series.where`
+        gain = _rolling_mean(np.where(delta > 0, delta, 0.0), 14)
+        loss = _rolling_mean(np.where(delta < 0, -delta, 0.0), 14)
+        out[:, 14] = 100 - (100 / (1 + gain / loss))
+
+        out[:, 15] = macd
+        out[:, 16] = signal
+
+        std20 = _rolling_std(close, 20)
+        out[:, 17] = ma20
+        out[:, 18] = ma20 + std20 * 2
+        out[:, 19] = ma20 - std20 * 2
+
+    return out
+
+
+def features_from_history(df: pd.DataFrame) -> pd.DataFrame:
+    """Feature frame for a yfinance history frame, with warm-up rows dropped."""
+    adj_close = df['Adj Close'].to_numpy() if 'Adj Close' in df.columns else None
+    matrix = compute_feature_matrix(
+        df['Open'].to_numpy(), df['High'].to_numpy(), df['Low'].to_numpy(),
+        df['Close'].to_numpy(), df['Volume'].to_numpy(), adj_close
+    )
+    valid = ~np.isnan(matrix).any(axis=1)
+    return pd.DataFrame(matrix[valid], index=df.index[valid], columns=FEATURES)
+
+
+def fetch_history(symbol: str, period: str = '1y') -> pd.DataFrame:
+    """Raw daily OHLCV history for `symbol`, served from the local history store."""
+    try:
+        df = history_store.get(symbol, period)
+    except CircuitOpen:
+        # Let the caller answer "try again later" rather than "bad symbol"
+        raise
+    except requests.exceptions.RequestException as e:
+        logging.error(f'Network error fetching {symbol}: {e}')
+        raise ValueError(f'Network error: Unable to fetch data for {symbol}. Please check your internet connection.')
+    if df.empty:
+        raise ValueError(f'No historical data from yfinance for symbol {symbol}. The symbol may be invalid or delisted.')
+    return df
+
+
+def get_features_df(symbol: str, period: str = '1y') -> pd.DataFrame:
+    """Fetch yfinance history and calculate all features required by the model."""
+    result = features_from_history(fetch_history(symbol, period))
+    if result.empty:
+        raise ValueError(f'Insufficient data after calculating indicators for {symbol}')
+    return result
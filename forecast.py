@@ -0,0 +1,165 @@
+import math
+from collections import deque
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from features import FEATURES, TIME_STEP, ewm_state, features_from_history
+
+N_FEATURES = len(FEATURES)
+PRICE_COLUMNS = slice(0, 5)  # Open, High, Low, Close, Adj Close
+
+
+def _mean(values) -> float:
+    return sum(values) / len(values)
+
+
+def _std(values) -> float:
+    m = _mean(values)
+    return math.sqrt(sum((v - m) ** 2 for v in values) / (len(values) - 1))
+
+
+class IndicatorState:
+    """Rolling and EWM indicator state that advances one close at a time.
+
+    Produces the same values as `features.compute_feature_matrix` would for a history
+    extended by the pushed closes, without touching the history again.
+    """
+
+    def __init__(self, close: np.ndarray, last_row: np.ndarray):
+        """`close` runs up to the bar of `last_row`, which has every indicator defined, so the
+        closes its rolling windows need are real ones; earlier NaN closes only affect the EMAs.
+        """
+        close = np.asarray(close, dtype=np.float64)
+        self.closes = deque(close[-50:].tolist(), maxlen=50)
+
+        diffs = np.diff(close[-15:])
+        self.gains = deque(np.where(diffs > 0, diffs, 0.0).tolist(), maxlen=14)
+        self.losses = deque(np.where(diffs < 0, -diffs, 0.0).tolist(), maxlen=14)
+        self.returns = deque((close[-21:][1:] / close[-21:][:-1] - 1).tolist(), maxlen=20)
+
+        # EMA12/EMA26 are not model features, so replay the same recurrence to recover them
+        self.e10, self.e20, self.e12, self.e26, self.s9 = ewm_state(close)
+
+        self.last_row = np.array(last_row, dtype=np.float64)
+
+    def push(self, price: float) -> np.ndarray:
+        """Advance by one bar closing at `price` and return its raw 20-feature row."""
+        prev = self.closes[-1]
+        self.closes.append(price)
+        delta = price - prev
+        self.gains.append(delta if delta > 0 else 0.0)
+        self.losses.append(-delta if delta < 0 else 0.0)
+        daily_return = price / prev - 1
+        self.returns.append(daily_return)
+
+        self.e10 += 2 / 11 * (price - self.e10)
+        self.e20 += 2 / 21 * (price - self.e20)
+        self.e12 += 2 / 13 * (price - self.e12)
+        self.e26 += 2 / 27 * (price - self.e26)
+        macd = self.e12 - self.e26
+        self.s9 += 2 / 10 * (macd - self.s9)
+
+        closes = list(self.closes)
+        last20 = closes[-20:]
+        ma20 = _mean(last20)
+        std20 = _std(last20)
+
+        row = self.last_row.copy()
+        row[PRICE_COLUMNS] = price
+        # Volume is unknown for future bars and carries forward
+        row[6] = daily_return
+        row[7] = math.log1p(daily_return)
+        row[8] = _mean(closes[-10:])
+        row[9] = ma20
+        row[10] = _mean(closes)
+        row[11] = self.e10
+        row[12] = self.e20
+        row[13] = _std(self.returns)
+        gain = _mean(self.gains)
+        loss = _mean(self.losses)
+        if loss > 0:
+            row[14] = 100 - 100 / (1 + gain / loss)
+        elif gain > 0:
+            row[14] = 100.0
+        # A flat window leaves RSI undefined; keep the previous value
+        row[15] = macd
+        row[16] = self.s9
+        row[17] = ma20
+        row[18] = ma20 + std20 * 2
+        row[19] = ma20 - std20 * 2
+
+        self.last_row = row
+        return row
+
+
+class ForecastEngine:
+    """Recursive one-step-ahead forecaster over a fixed window of pre-scaled features.
+
+    The last `TIME_STEP` scaled rows live in a doubled ring buffer, so the current
+    window is always a contiguous slice and each step costs one row write.
+    """
+
+    def __init__(self, history: pd.DataFrame, scaler_X: Any, scaler_y: Any):
+        features = features_from_history(history)
+        if len(features) < TIME_STEP:
+            raise ValueError(f'Not enough historical data to create a feature window of {TIME_STEP} days.')
+
+        # MinMaxScaler.transform is X * scale_ + min_
+        self.x_scale = np.asarray(scaler_X.scale_, dtype=np.float64)
+        self.x_min = np.asarray(scaler_X.min_, dtype=np.float64)
+        self.y_scale = float(np.ravel(scaler_y.scale_)[0])
+        self.y_min = float(np.ravel(scaler_y.min_)[0])
+
+        raw = features.to_numpy()
+        self.last_date = pd.to_datetime(features.index[-1])
+        self.last_close = float(raw[-1, 3])
+        # Trailing bars whose indicators came out NaN were dropped from the features; the
+        # state has to stop at the same bar as the window
+        end = int(np.flatnonzero(history.index == features.index[-1])[-1]) + 1
+        self.state = IndicatorState(history['Close'].to_numpy()[:end], raw[-1])
+
+        window = raw[-TIME_STEP:] * self.x_scale + self.x_min
+        self._buffer = np.concatenate([window, window])
+        self._pos = 0
+
+    def window(self) -> np.ndarray:
+        """The current `(TIME_STEP, 20)` scaled window, oldest row first."""
+        return self._buffer[self._pos:self._pos + TIME_STEP]
+
+    def to_price(self, scaled: np.ndarray) -> np.ndarray:
+        return (np.asarray(scaled, dtype=np.float64) - self.y_min) / self.y_scale
+
+    def advance(self, price: float) -> None:
+        row = self.state.push(float(price)) * self.x_scale + self.x_min
+        self._buffer[self._pos] = row
+        self._buffer[self._pos + TIME_STEP] = row
+        self._pos = (self._pos + 1) % TIME_STEP
+
+    def forecast(self, days: int, predict: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+        """Predict `days` closes; `predict` maps a `(k, TIME_STEP, 20)` batch to `k` scaled outputs."""
+        prices = np.empty(days)
+        for i in range(days):
+            scaled = np.ravel(predict(self.window()[np.newaxis]))[0]
+            prices[i] = self.to_price(scaled)
+            self.advance(prices[i])
+        return prices
+
+
+def forecast_batch(engines, days: int, predict: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    """Advance several engines in lockstep with one `predict` call per step.
+
+    Returns a `(len(engines), days)` array of predicted closes.
+    """
+    k = len(engines)
+    prices = np.empty((k, days))
+    batch = np.empty((k, TIME_STEP, N_FEATURES))
+    for i in range(days):
+        for j, engine in enumerate(engines):
+            batch[j] = engine.window()
+        scaled = np.ravel(predict(batch))
+        for j, engine in enumerate(engines):
+            prices[j, i] = engine.to_price(scaled[j])
+            engine.advance(prices[j, i])
+    return prices
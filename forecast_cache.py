@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from cache_backend import CacheBackend, get_cache
+
+ForecastKey = Tuple[str, str, str, str]
+
+# Keys include the last bar date, so old entries are never read again once a new bar lands
+ENTRY_TTL = 3 * 24 * 3600
+# Forecast files kept on disk; beyond this the least recently used go first
+MAX_DISK_FILES = int(os.getenv('FORECAST_CACHE_DISK_FILES', 4096))
+# The disk tier is swept for expired and surplus files at most this often (seconds)
+SWEEP_INTERVAL = 60
+
+
+def forecast_key(symbol: str, model: str, version: str, last_date: str) -> ForecastKey:
+    """A forecast is fully determined by the symbol, the model version and the last bar it saw."""
+    return (symbol.upper(), model, version, last_date)
+
+
+class ForecastCache:
+    """Bounded cache of recursive forecasts with an optional on-disk tier.
+
+    Entries hold the longest horizon computed so far for a key; shorter requests are
+    served as a prefix of it. The memory tier is a `CacheBackend`, so with a shared
+    backend every worker sees forecasts computed by the others.
+    """
+
+    def __init__(self, max_entries: int = 512, disk_dir: Optional[str] = None,
+                 backend: Optional[CacheBackend] = None, max_disk_files: int = MAX_DISK_FILES):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_files = max_disk_files
+        self._last_sweep = 0.0
+        self._entries = backend if backend is not None else get_cache('forecast', max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _path(self, key: ForecastKey) -> str:
+        name = hashlib.sha1('|'.join(key).encode()).hexdigest()
+        return os.path.join(self.disk_dir, f'{name}.json')
+
+    def _read_disk(self, key: ForecastKey) -> Optional[Dict[str, Any]]:
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > ENTRY_TTL:
+                return None
+            with open(path, 'r') as f:
+                entry = json.load(f)
+            # The mtime doubles as the last use for the sweep
+            os.utime(path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f'Ignoring unreadable forecast cache file for {key}: {e}')
+            return None
+
+    def _write_disk(self, key: ForecastKey, entry: Dict[str, Any]) -> None:
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            logging.warning(f'Failed to persist forecast for {key}: {e}')
+        self._sweep(keep=path)
+
+    def _sweep(self, keep: str) -> None:
+        """Delete files unused for ENTRY_TTL, then the least recently used past `max_disk_files`."""
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < SWEEP_INTERVAL:
+                return
+            self._last_sweep = now
+
+        entries = []
+        stale = []
+        for name in os.listdir(self.disk_dir):
+            path = os.path.join(self.disk_dir, name)
+            try:
+                used = os.path.getmtime(path)
+            except OSError:
+                continue
+            if '.tmp' in name:
+                # Only a crashed write leaves one behind for long
+                if now - used > SWEEP_INTERVAL:
+                    stale.append(path)
+            elif now - used > ENTRY_TTL:
+                stale.append(path)
+            elif path != keep:
+                entries.append((used, path))
+
+        entries.sort()
+        # The file just written is never evicted but counts towards the limit
+        surplus = len(entries) + 1 - self.max_disk_files
+        stale += [path for used, path in entries[:max(0, surplus)]]
+        removed = 0
+        for path in stale:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            removed += 1
+        if removed:
+            logging.info(f'Removed {removed} cached forecast files from {self.disk_dir}')
+
+    def get(self, key: ForecastKey, days: int) -> Optional[Dict[str, Any]]:
+        """Return `{'predictions', 'last_date', 'last_close'}` for the first `days` steps, or None."""
+        entry = self._entries.get('|'.join(key))
+        source = 'memory'
+        if entry is None:
+            entry = self._read_disk(key)
+            source = 'disk'
+            if entry is not None:
+                self._entries.set('|'.join(key), entry, ENTRY_TTL)
+
+        with self._lock:
+            if entry is None or len(entry['predictions']) < days:
+                self.misses += 1
+                return None
+            if source == 'disk':
+                self.disk_hits += 1
+            else:
+                self.hits += 1
+        return dict(entry, predictions=entry['predictions'][:days])
+
+    def put(self, key: ForecastKey, predictions, last_date: str, last_close: float) -> None:
+        """Store a forecast unless a longer one for the same key is already cached."""
+        entry = {'predictions': list(predictions), 'last_date': last_date, 'last_close': last_close}
+        current = self._entries.get('|'.join(key))
+        if current is not None and len(current['predictions']) >= len(entry['predictions']):
+            return
+        self._entries.set('|'.join(key), entry, ENTRY_TTL)
+        self._write_disk(key, entry)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'backend': self._entries.stats(),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                'disk_dir': self.disk_dir,
+                'max_disk_files': self.max_disk_files,
+            }
+
+
+# Set FORECAST_CACHE_DIR to keep forecasts across restarts
+forecast_cache = ForecastCache(
+    max_entries=int(os.getenv('FORECAST_CACHE_SIZE', 512)),
+    disk_dir=os.getenv('FORECAST_CACHE_DIR') or None
+)
@@ -0,0 +1,389 @@
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from yfinance.exceptions import YFTickerMissingError
+
+from cache_backend import cache_lock, get_cache
+from singleflight import SingleFlight
+from upstream import CircuitOpen, upstream
+
+HISTORY_DIR = os.getenv('HISTORY_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'history')
+# Total size of stored bars before the least recently read symbols are evicted
+MAX_STORE_BYTES = int(os.getenv('HISTORY_MAX_BYTES', 256 * 1024 * 1024))
+# Stored bars younger than this are served without asking yfinance for newer ones
+MAX_AGE_SECONDS = int(os.getenv('HISTORY_MAX_AGE', 6 * 3600))
+# Per-request timeout of a yfinance download
+DOWNLOAD_TIMEOUT = 15
+# Upper bound on one worker's update while others wait for it: a delta and a full refetch,
+# each up to two yfinance requests (time zone, then bars), plus writing the arrays
+REFRESH_LOCK_TTL = 4 * DOWNLOAD_TIMEOUT + 30
+# Breaker key for every yfinance call
+YAHOO_HOST = 'finance.yahoo.com'
+
+# By default yfinance logs timeouts and outages and returns an empty frame, which would look
+# like "no new bars" or "unknown symbol"; make it raise so they count as failures
+if hasattr(yf, 'config'):
+    yf.config.debug.hide_exceptions = False
+    YF_RAISE_ERRORS = {}
+else:
+    YF_RAISE_ERRORS = {'raise_errors': True}
+
+# Row order of the stored (6, n) array; each row is one contiguous column
+COLUMNS = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+
+# Coarser bars kept next to the daily ones; each is dated by its week's Monday or month's 1st
+INTERVALS = ('1d', '1wk', '1mo')
+TIERS = ('1wk', '1mo')
+
+YF_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+PERIODS = {
+    '1d': ('bars', 1), '5d': ('bars', 5),
+    '1mo': ('months', 1), '3mo': ('months', 3), '6mo': ('months', 6),
+    '1y': ('years', 1), '2y': ('years', 2), '5y': ('years', 5), '10y': ('years', 10),
+    'ytd': ('ytd', 0), 'max': ('max', 0),
+}
+
+
+class HistoryNotFound(ValueError):
+    """yfinance returned no bars for the symbol."""
+
+
+def _download(symbol: str, start: Optional[pd.Timestamp] = None, timeout: int = DOWNLOAD_TIMEOUT) -> pd.DataFrame:
+    """Fetch daily bars from yfinance, all of them or from `start` on, in a single attempt.
+
+    Raises CircuitOpen without calling Yahoo while it is failing; retrying is the caller's call.
+    Only a full fetch can end in HistoryNotFound: `start` is the last stored day, which Yahoo
+    always returns again, so an empty delta means Yahoo failed and counts against its breaker.
+    """
+    def fetch() -> pd.DataFrame:
+        ticker = yf.Ticker(symbol)
+        ticker.session.headers.update(YF_HEADERS)
+        try:
+            if start is None:
+                df = ticker.history(period='max', timeout=timeout, **YF_RAISE_ERRORS)
+            else:
+                df = ticker.history(start=start.strftime('%Y-%m-%d'), timeout=timeout, **YF_RAISE_ERRORS)
+        except YFTickerMissingError as e:
+            # Yahoo answered, but has nothing for the symbol; an HTTP error status is an outage instead
+            if start is None and 'status_code' not in str(e):
+                raise HistoryNotFound(f'No historical data from yfinance for symbol {symbol}. The symbol may be invalid or delisted.') from e
+            raise
+        if df is None or df.empty:
+            if start is not None:
+                raise ValueError(f'yfinance returned no bars for {symbol} since {start.date()}, not even the stored last one')
+            raise HistoryNotFound(f'No historical data from yfinance for symbol {symbol}. The symbol may be invalid or delisted.')
+        return df
+
+    try:
+        return upstream.call(YAHOO_HOST, fetch, expected=(HistoryNotFound,))
+    except (HistoryNotFound, CircuitOpen):
+        raise
+    except Exception as e:
+        logging.error(f'Error fetching {symbol}: {type(e).__name__} - {e}')
+        raise
+
+
+def _to_columns(df: pd.DataFrame) -> np.ndarray:
+    """yfinance frame -> (6, n) float64 array with dates as epoch days of the exchange-local date."""
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    days = index.normalize().values.astype('datetime64[D]').astype(np.int64)
+    out = np.empty((len(COLUMNS), len(df)))
+    out[0] = days
+    for i, col in enumerate(COLUMNS[1:], start=1):
+        out[i] = df[col].to_numpy(dtype=np.float64)
+    return out
+
+
+def slice_period(data: np.ndarray, period: str) -> np.ndarray:
+    """Cut a yfinance-style `period` off the end of a stored (6, n) array."""
+    if period not in PERIODS:
+        raise ValueError(f'Invalid period: {period}')
+    kind, amount = PERIODS[period]
+    n = data.shape[1]
+    if kind == 'max' or n == 0:
+        return data
+    if kind == 'bars':
+        return data[:, max(0, n - amount):]
+
+    last = pd.Timestamp(int(data[0, -1]), unit='D')
+    if kind == 'ytd':
+        cutoff = pd.Timestamp(year=last.year, month=1, day=1) - pd.Timedelta(days=1)
+    elif kind == 'months':
+        cutoff = last - pd.DateOffset(months=amount)
+    else:
+        cutoff = last - pd.DateOffset(years=amount)
+    start = np.searchsorted(data[0], (cutoff - pd.Timestamp(0)).days, side='right')
+    return data[:, start:]
+
+
+def slice_days(data: np.ndarray, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+    """Bars of a stored (6, n) array dated from `start` to `end` (epoch days, both inclusive)."""
+    lo = 0 if start is None else np.searchsorted(data[0], start, side='left')
+    hi = data.shape[1] if end is None else np.searchsorted(data[0], end, side='right')
+    return data[:, lo:max(lo, hi)]
+
+
+def _bucket_starts(days: np.ndarray, interval: str) -> np.ndarray:
+    """Epoch day on which each bar's week (Monday) or month (1st) starts."""
+    days = np.asarray(days).astype(np.int64)
+    if interval == '1wk':
+        # Epoch day 0 was a Thursday
+        return days - (days + 3) % 7
+    return days.astype('datetime64[D]').astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+
+
+def resample(data: np.ndarray, interval: str) -> np.ndarray:
+    """Aggregate (6, n) daily bars into weekly or monthly OHLCV bars of the same layout."""
+    n = data.shape[1]
+    if n == 0:
+        return np.empty((len(COLUMNS), 0))
+    starts = _bucket_starts(data[0], interval)
+    first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    last = np.r_[first[1:] - 1, n - 1]
+    out = np.empty((len(COLUMNS), len(first)))
+    out[0] = starts[first]
+    out[1] = data[1, first]
+    out[2] = np.fmax.reduceat(data[2], first)
+    out[3] = np.fmin.reduceat(data[3], first)
+    out[4] = data[4, last]
+    out[5] = np.add.reduceat(np.nan_to_num(data[5]), first)
+    return out
+
+
+def _extend_tier(tier: Optional[np.ndarray], daily: np.ndarray, interval: str,
+                 changed_from: Optional[float]) -> np.ndarray:
+    """Update a resampled tier by recomputing only the buckets from the one holding `changed_from` on."""
+    if tier is None or changed_from is None:
+        return resample(daily, interval)
+    bucket = _bucket_starts([changed_from], interval)[0]
+    keep = np.searchsorted(tier[0], bucket, side='left')
+    first = np.searchsorted(daily[0], bucket, side='left')
+    return np.concatenate([tier[:, :keep], resample(daily[:, first:], interval)], axis=1)
+
+
+def to_frame(data: np.ndarray) -> pd.DataFrame:
+    """(6, n) stored array -> OHLCV frame indexed by date, like `Ticker.history`."""
+    return pd.DataFrame(
+        {col: np.array(data[i]) for i, col in enumerate(COLUMNS) if i},
+        index=pd.DatetimeIndex(data[0].astype('datetime64[D]'), name='Date')
+    )
+
+
+def _is_tier(name: str) -> bool:
+    return any(name.endswith(f'.{interval}.npy') for interval in TIERS)
+
+
+class HistoryStore:
+    """Per-symbol daily OHLCV bars kept on disk as memory-mapped column arrays.
+
+    The first read of a symbol downloads its full history; later reads only ask yfinance
+    for bars from the last stored date on, at most once per `max_age` seconds.
+    """
+
+    def __init__(self, root: str = HISTORY_DIR, max_bytes: int = MAX_STORE_BYTES, max_age: int = MAX_AGE_SECONDS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._flight = SingleFlight()
+        self._shared = get_cache('history', max_entries=1024)
+        os.makedirs(root, exist_ok=True)
+
+    def _paths(self, symbol: str):
+        name = symbol.upper().replace('/', '_')
+        return os.path.join(self.root, f'{name}.npy'), os.path.join(self.root, f'{name}.json')
+
+    def _tier_path(self, symbol: str, interval: str) -> str:
+        return self._paths(symbol)[0][:-4] + f'.{interval}.npy'
+
+    def _read(self, symbol: str):
+        data_path, meta_path = self._paths(symbol)
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            data = np.load(data_path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None, None
+        return data, meta
+
+    def _save(self, path: str, data: np.ndarray) -> None:
+        tmp_path = f'{path}.{os.getpid()}.tmp.npy'
+        np.save(tmp_path, np.ascontiguousarray(data))
+        os.replace(tmp_path, path)
+
+    def _write(self, symbol: str, data: np.ndarray, changed_from: Optional[float] = None) -> None:
+        """Store daily bars and update the coarser tiers from day `changed_from` on (all if None)."""
+        data_path, meta_path = self._paths(symbol)
+        pid = os.getpid()
+        self._save(data_path, data)
+        for interval in TIERS:
+            path = self._tier_path(symbol, interval)
+            try:
+                tier = np.load(path, mmap_mode='r')
+            except (OSError, ValueError):
+                tier = None
+            self._save(path, _extend_tier(tier, data, interval, changed_from))
+        # The meta file goes last: its timestamp is what marks the symbol fresh
+        with open(f'{meta_path}.{pid}.tmp', 'w') as f:
+            json.dump({'symbol': symbol, 'fetched_at': time.time(), 'rows': int(data.shape[1])}, f)
+        os.replace(f'{meta_path}.{pid}.tmp', meta_path)
+
+    def _refresh(self, symbol: str, stored: Optional[np.ndarray]) -> Tuple[np.ndarray, Optional[float]]:
+        """(updated bars, first day that changed); the day is None when everything was refetched."""
+        if stored is None or stored.shape[1] == 0:
+            return _to_columns(_download(symbol)), None
+
+        # Re-request the last stored bar too, so a partial intraday bar gets completed
+        last_day = pd.Timestamp(int(stored[0, -1]), unit='D')
+        delta = _download(symbol, start=last_day)
+        new = _to_columns(delta)
+        # A dividend or split on a new bar re-adjusts past prices, so the stored bars are stale
+        unseen = new[0] > stored[0, -1]
+        for col in ('Dividends', 'Stock Splits'):
+            if col in delta.columns and (delta[col].fillna(0).to_numpy()[unseen] != 0).any():
+                logging.info(f'{col} in new bars for {symbol}; refetching full history')
+                return _to_columns(_download(symbol)), None
+
+        keep = np.searchsorted(stored[0], new[0, 0], side='left')
+        return np.concatenate([stored[:, :keep], new], axis=1), new[0, 0]
+
+    def load(self, symbol: str) -> np.ndarray:
+        """Full stored history for `symbol` as a (6, n) array, updated from yfinance when stale."""
+        if not symbol:
+            raise ValueError('No symbol provided')
+        data, meta = self._read(symbol)
+        if data is not None and time.time() - meta.get('fetched_at', 0) < self.max_age:
+            os.utime(self._paths(symbol)[1])
+            return data
+
+        # Concurrent requests for a stale symbol share one upstream fetch and its outcome
+        return self._flight.do((symbol.upper(), 'max', '1d'), lambda: self._update(symbol))
+
+    def refresh(self, symbol: str) -> np.ndarray:
+        """Update `symbol` from yfinance if stale, raising instead of serving stored bars on failure."""
+        return self._flight.do((symbol.upper(), 'max', '1d'), lambda: self._update(symbol, serve_stale=False))
+
+    def _update(self, symbol: str, serve_stale: bool = True) -> np.ndarray:
+        deadline = time.time() + REFRESH_LOCK_TTL
+        while True:
+            # Re-check: the previous flight may have finished just before this one started
+            data, meta = self._read(symbol)
+            if data is not None and time.time() - meta.get('fetched_at', 0) < self.max_age:
+                return data
+            with cache_lock(self._shared, f'refresh:{symbol.upper()}', REFRESH_LOCK_TTL) as locked:
+                if locked:
+                    try:
+                        updated, changed_from = self._refresh(symbol, data)
+                    except Exception as e:
+                        if not serve_stale:
+                            raise
+                        if not isinstance(e, (HistoryNotFound, CircuitOpen)):
+                            # Try again off the request thread so a later read finds the new bars
+                            upstream.retry_later(YAHOO_HOST, ('history', symbol.upper()), lambda: self.refresh(symbol))
+                        if data is None:
+                            raise
+                        logging.warning(f'Serving stored history for {symbol}; update failed: {e}')
+                        return data
+                    self._write(symbol, updated, changed_from)
+                    break
+            # Another worker process is already updating this symbol
+            if data is not None:
+                return data
+            if time.time() > deadline:
+                raise TimeoutError(f'Timed out waiting for another worker to fetch {symbol}')
+            time.sleep(0.2)
+
+        logging.info(f'Stored {updated.shape[1]} bars for {symbol} ({0 if data is None else data.shape[1]} before)')
+        self._evict(keep=symbol)
+        return updated
+
+    def get(self, symbol: str, period: str = 'max') -> pd.DataFrame:
+        """OHLCV frame for `symbol` covering `period` (yfinance period names)."""
+        return to_frame(self.get_columns(symbol, period))
+
+    def load_tier(self, symbol: str, interval: str) -> np.ndarray:
+        """Stored weekly ('1wk') or monthly ('1mo') bars for `symbol`, kept in step with the daily ones."""
+        if interval not in TIERS:
+            raise ValueError(f'Invalid interval: {interval}')
+        daily = self.load(symbol)
+        path = self._tier_path(symbol, interval)
+        try:
+            tier = np.load(path, mmap_mode='r')
+            if daily.shape[1] == 0 or (tier.shape[1] and tier[0, -1] == _bucket_starts(daily[0, -1:], interval)[0]):
+                return tier
+        except (OSError, ValueError):
+            pass
+        # Stored before tiers existed, or caught between two writes: rebuild from the daily bars
+        tier = resample(daily, interval)
+        self._save(path, tier)
+        return tier
+
+    def get_columns(self, symbol: str, period: str = 'max', start: Optional[int] = None,
+                    end: Optional[int] = None, interval: str = '1d') -> np.ndarray:
+        """Stored (6, n) array for `period`, optionally cut to `start`..`end` (epoch days, inclusive).
+
+        Skips the DataFrame for callers that only need columns. `interval` '1wk' or '1mo'
+        reads the precomputed coarse bars instead of the daily ones.
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f'Invalid interval: {interval}')
+        data = self.load(symbol) if interval == '1d' else self.load_tier(symbol, interval)
+        data = slice_period(data, period)
+        if start is not None or end is not None:
+            data = slice_days(data, start, end)
+        return data
+
+    def _evict(self, keep: str) -> None:
+        entries = []
+        total = 0
+        for name in os.listdir(self.root):
+            if not name.endswith('.npy') or '.tmp' in name or _is_tier(name):
+                continue
+            data_path = os.path.join(self.root, name)
+            meta_path = data_path[:-4] + '.json'
+            tier_paths = [data_path[:-4] + f'.{interval}.npy' for interval in TIERS]
+            try:
+                size = os.path.getsize(data_path) + sum(os.path.getsize(p) for p in tier_paths if os.path.exists(p))
+                accessed = os.path.getmtime(meta_path) if os.path.exists(meta_path) else 0
+            except OSError:
+                continue
+            total += size
+            entries.append((accessed, size, data_path, meta_path, tier_paths))
+
+        kept_path = self._paths(keep)[0]
+        for accessed, size, data_path, meta_path, tier_paths in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if data_path == kept_path:
+                continue
+            for path in (meta_path, data_path, *tier_paths):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            logging.info(f'Evicted stored history {os.path.basename(data_path)}')
+
+    def stats(self) -> Dict[str, int]:
+        files = [n for n in os.listdir(self.root) if n.endswith('.npy') and '.tmp' not in n]
+        return {
+            'symbols': sum(1 for n in files if not _is_tier(n)),
+            'bytes': sum(os.path.getsize(os.path.join(self.root, n)) for n in files),
+            'max_bytes': self.max_bytes,
+            'upstream': self._flight.stats(),
+        }
+
+
+history_store = HistoryStore()
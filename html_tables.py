@@ -0,0 +1,92 @@
+import re
+from typing import Iterator, List, Optional, Tuple
+
+import lxml.html
+from lxml import etree
+
+_PARSER = lxml.html.HTMLParser(encoding='utf-8')
+
+
+def has_class(name: str) -> str:
+    """XPath predicate matching elements whose class list contains `name` (like CSS `.name`)."""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+_TABLE_TAG = re.compile(r'<(/?)table\b', re.I)
+
+
+def _open_tags(html: str, anchor: str) -> Iterator[Tuple[int, str]]:
+    """(start, tag name) of every opening tag whose own markup contains `anchor`.
+
+    Matches in text, comments, <style> or <script> bodies sit outside a tag and are skipped.
+    """
+    at = html.find(anchor)
+    while at >= 0:
+        start = html.rfind('<', 0, at)
+        if start >= 0 and html.find('>', start) > at:
+            name = re.match(r'<([a-zA-Z][\w-]*)', html[start:])
+            if name:
+                yield start, name.group(1).lower()
+        at = html.find(anchor, at + len(anchor))
+
+
+def _table_end(html: str, start: int) -> int:
+    """Offset just past the </table> closing the table opened at or after `start`, or -1."""
+    depth = 0
+    for tag in _TABLE_TAG.finditer(html, start):
+        if not tag.group(1):
+            depth += 1
+        elif depth:
+            depth -= 1
+            if not depth:
+                return html.find('>', tag.end()) + 1 or -1
+    return -1
+
+
+def _slice_table(html: str, anchor: str) -> Optional[str]:
+    """The markup from the tag carrying `anchor` to the end of the table it is or holds.
+
+    A <table> whose attributes contain `anchor` wins over any other tag that does (a
+    wrapper div, or a nav link pointing at it); nested tables are kept whole.
+    """
+    tags = sorted(_open_tags(html, anchor), key=lambda tag: tag[1] != 'table')
+    if not tags:
+        return None
+    start = tags[0][0]
+    end = _table_end(html, start)
+    if end < 0:
+        return None
+    return html[start:end]
+
+
+def _rows(markup: str, xpath: str, limit: Optional[int]) -> List[List[str]]:
+    if not markup.strip():
+        return []
+    try:
+        root = lxml.html.fromstring(markup.encode('utf-8'), parser=_PARSER)
+    except etree.ParserError:
+        return []
+    rows = root.xpath(xpath)
+    if limit is not None:
+        rows = rows[:limit]
+    return [[td.text_content() for td in row.iterfind('.//td')] for row in rows]
+
+
+def table_rows(html: str, xpath: str, anchor: Optional[str] = None,
+               limit: Optional[int] = None) -> List[List[str]]:
+    """Text of every <td> (nested ones included) in each row matched by `xpath`.
+
+    Parsing uses lxml. With an `anchor` (a string that only occurs in the target table's
+    markup, e.g. its class or id) only that table is parsed instead of the whole page;
+    if the slice comes up short of `limit` rows the full page is parsed too, and whichever
+    found more rows wins.
+    """
+    if anchor is not None:
+        fragment = _slice_table(html, anchor)
+        if fragment is not None:
+            rows = _rows(fragment, xpath, limit)
+            if limit is not None and len(rows) >= limit:
+                return rows
+            full = _rows(html, xpath, limit)
+            return full if len(full) > len(rows) else rows
+    return _rows(html, xpath, limit)
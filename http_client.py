@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import InvalidHeader
+from urllib3.util.retry import Retry
+
+from upstream import upstream
+
+DEFAULT_TIMEOUT = 10
+# Responses that count against a host's breaker; other 4xx mean the host is up
+BREAKER_STATUSES = frozenset({429, 500, 502, 503, 504})
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+
+class HttpClient:
+    """One keep-alive session for every outbound scraper/API call.
+
+    Connections are pooled per host, cookies persist between calls (NSE needs this),
+    failed connects are retried with a short backoff, and every request has a timeout.
+    Error statuses are not retried here: sleeping out a Retry-After would hold the
+    calling thread, so the hint goes to the upstream breaker instead.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, retries: int = 2, pool_maxsize: int = 10):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        retry = Retry(
+            total=retries, connect=retries, read=0, status=0, other=0,
+            backoff_factor=0.3, backoff_max=1.0,
+            allowed_methods=frozenset({'GET', 'HEAD'}), respect_retry_after_header=False,
+            raise_on_status=False
+        )
+        self.adapter = HTTPAdapter(pool_connections=20, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self._metrics: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _record(self, host: str, elapsed: float, ok: bool) -> None:
+        with self._lock:
+            m = self._metrics.setdefault(host, {'requests': 0, 'errors': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            m['requests'] += 1
+            m['errors'] += 0 if ok else 1
+            m['total_seconds'] += elapsed
+            m['max_seconds'] = max(m['max_seconds'], elapsed)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request unless `url`'s host is cut off by the upstream breaker (CircuitOpen)."""
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlsplit(url).netloc
+        upstream.check(host)
+        start = time.perf_counter()
+        ok = False
+        error = None
+        retry_after = None
+        try:
+            response = self.session.request(method, url, **kwargs)
+            ok = response.status_code < 400
+            if response.status_code in BREAKER_STATUSES:
+                error = f'HTTP {response.status_code}'
+                retry_after = self._retry_after(response)
+            return response
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            upstream.record(host, error, retry_after)
+            self._record(host, time.perf_counter() - start, ok)
+
+    def _retry_after(self, response: requests.Response) -> Optional[float]:
+        """Seconds asked for by the response's Retry-After header (delay or HTTP date), if any."""
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return self.adapter.max_retries.parse_retry_after(value)
+        except InvalidHeader:
+            return None
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def has_cookies(self, domain: str) -> bool:
+        return any(domain in (cookie.domain or '') for cookie in self.session.cookies)
+
+    def prime_cookies(self, url: str, **kwargs) -> None:
+        """Visit `url` once so the site's session cookies land in the jar."""
+        try:
+            self.get(url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            logging.warning(f'Failed to prime cookies from {url}: {e}')
+
+    def metrics(self) -> Dict[str, Any]:
+        """Per-host request counts, latency and connection reuse."""
+        pools = {}
+        poolmanager = self.adapter.poolmanager
+        for key in list(poolmanager.pools.keys()):
+            pool = poolmanager.pools.get(key)
+            if pool is not None:
+                pools[pool.host] = (pool.num_connections, pool.num_requests)
+
+        with self._lock:
+            result = {}
+            for host, m in self._metrics.items():
+                connections, pool_requests = pools.get(host.split(':')[0], (0, 0))
+                result[host] = {
+                    'requests': int(m['requests']),
+                    'errors': int(m['errors']),
+                    'avg_ms': round(1000 * m['total_seconds'] / m['requests'], 1),
+                    'max_ms': round(1000 * m['max_seconds'], 1),
+                    'connections_opened': connections,
+                    'connections_reused': max(0, pool_requests - connections),
+                }
+            return result
+
+
+http = HttpClient()
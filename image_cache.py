@@ -0,0 +1,164 @@
+import hashlib
+import io
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+from cache_backend import MemoryCache
+from http_client import http
+from singleflight import SingleFlight
+
+try:
+    from PIL import Image
+except ImportError:  # Without Pillow, small images are cached as-is and large ones are not cached
+    Image = None
+
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'images')
+IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+THUMB_SIZE = (480, 320)
+THUMB_QUALITY = 70
+FETCH_TIMEOUT = 5.0
+# Largest upstream image read, and largest one cached unresized when Pillow is missing
+MAX_SOURCE_BYTES = 8 * 1024 * 1024
+MAX_PASSTHROUGH_BYTES = 512 * 1024
+# A URL that failed is not retried for this long
+FAILURE_TTL = 600
+
+MIMETYPES = {'.webp': 'image/webp', '.jpg': 'image/jpeg', '.png': 'image/png', '.gif': 'image/gif'}
+EXTENSIONS = {mimetype: ext for ext, mimetype in MIMETYPES.items()}
+
+
+def _read_limited(url: str) -> Tuple[bytes, str]:
+    response = http.get(url, timeout=FETCH_TIMEOUT, stream=True)
+    try:
+        if response.status_code != 200:
+            raise ValueError(f'HTTP {response.status_code}')
+        content_type = (response.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+        if not content_type.startswith('image/'):
+            raise ValueError(f'not an image ({content_type or "no content type"})')
+        body = io.BytesIO()
+        for chunk in response.iter_content(64 * 1024):
+            body.write(chunk)
+            if body.tell() > MAX_SOURCE_BYTES:
+                raise ValueError('image too large')
+        return body.getvalue(), content_type
+    finally:
+        response.close()
+
+
+def make_thumbnail(data: bytes) -> Tuple[bytes, str]:
+    """Shrink an image to fit THUMB_SIZE and re-encode it as WebP (JPEG if WebP is unavailable)."""
+    image = Image.open(io.BytesIO(data))
+    # JPEGs can be decoded straight at a reduced scale
+    image.draft('RGB', THUMB_SIZE)
+    image.thumbnail(THUMB_SIZE)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    out = io.BytesIO()
+    try:
+        image.save(out, 'WEBP', quality=THUMB_QUALITY, method=4)
+        return out.getvalue(), 'image/webp'
+    except (KeyError, OSError):
+        out = io.BytesIO()
+        image.convert('RGB').save(out, 'JPEG', quality=THUMB_QUALITY, optimize=True)
+        return out.getvalue(), 'image/jpeg'
+
+
+class ImageCache:
+    """Thumbnails of remote images in a size-bounded directory, evicted least recently used first.
+
+    Each URL is fetched once; concurrent requests for it share the download.
+    """
+
+    def __init__(self, root: str = IMAGE_CACHE_DIR, max_bytes: int = IMAGE_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._flight = SingleFlight()
+        self._failures = MemoryCache(max_entries=4096)
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+
+    def _find(self, key: str) -> Optional[str]:
+        for ext in MIMETYPES:
+            path = os.path.join(self.root, key + ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _store(self, key: str, url: str) -> str:
+        data, content_type = _read_limited(url)
+        if Image is not None:
+            data, content_type = make_thumbnail(data)
+        elif content_type not in EXTENSIONS or len(data) > MAX_PASSTHROUGH_BYTES:
+            raise ValueError('cannot resize without Pillow')
+
+        path = os.path.join(self.root, key + EXTENSIONS[content_type])
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._evict(keep=path)
+        return path
+
+    def get(self, url: str) -> Optional[Tuple[str, str]]:
+        """(path, mimetype) of the cached thumbnail for `url`, fetching it on first use; None on failure."""
+        key = hashlib.sha256(url.encode()).hexdigest()[:32]
+        path = self._find(key)
+        if path is not None:
+            self.hits += 1
+            try:
+                os.utime(path)  # Mark as recently used
+            except OSError:
+                pass
+        else:
+            if self._failures.get(key) is not None:
+                return None
+            self.misses += 1
+            try:
+                path = self._flight.do(key, lambda: self._store(key, url))
+            except Exception as e:
+                logging.warning(f'Failed to cache image {url}: {e}')
+                self._failures.set(key, str(e), ttl=FAILURE_TTL)
+                return None
+        return path, MIMETYPES[os.path.splitext(path)[1]]
+
+    def _evict(self, keep: str) -> None:
+        entries = []
+        total = 0
+        for name in os.listdir(self.root):
+            if '.tmp' in name:
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            total += stat.st_size
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        for used, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def stats(self) -> Dict[str, int]:
+        files = [name for name in os.listdir(self.root) if '.tmp' not in name]
+        return {
+            'files': len(files),
+            'bytes': sum(os.path.getsize(os.path.join(self.root, name)) for name in files),
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'resizing': Image is not None,
+        }
+
+
+image_cache = ImageCache()
@@ -0,0 +1,226 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+import numpy as np
+
+from cache_backend import cache_lock, get_cache
+from fanout import run_concurrently
+from http_client import http
+from singleflight import SingleFlight
+
+NSE_HOME = 'https://www.nseindia.com'
+NSE_INDEX_URL = 'https://www.nseindia.com/api/equity-stockIndices?index={}'
+NSE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0',
+    'Accept': 'application/json'
+}
+
+# Indices kept in memory, and how often each is re-pulled from NSE
+INDICES = [name.strip() for name in os.getenv(
+    'MOVERS_INDICES', 'NIFTY 50,NIFTY 500,NIFTY BANK,NIFTY IT,NIFTY PHARMA,NIFTY AUTO').split(',') if name.strip()]
+DEFAULT_INDEX = 'NIFTY 50'
+REFRESH_INTERVAL = float(os.getenv('MOVERS_REFRESH_INTERVAL', 60))
+FETCH_TIMEOUT = 5.0
+REFRESH_BUDGET = 15.0
+REFRESH_LOCK_TTL = 30
+
+KINDS = ('gainers', 'losers', 'volume')
+
+
+class IndexSnapshot:
+    """One index's constituents as parallel numeric columns, for top-k queries."""
+
+    def __init__(self, index: str, symbols: List[str], price: np.ndarray, change: np.ndarray,
+                 change_percent: np.ndarray, volume: np.ndarray, timestamp: float):
+        self.index = index
+        self.symbols = symbols
+        self.price = price
+        self.change = change
+        self.change_percent = change_percent
+        self.volume = volume
+        self.timestamp = timestamp
+        # Descending orders are ascending on the negated column; missing values sort last
+        self._keys = {
+            'gainers': np.nan_to_num(-change_percent, nan=np.inf),
+            'losers': np.nan_to_num(change_percent, nan=np.inf),
+            'volume': np.nan_to_num(-volume, nan=np.inf),
+        }
+
+    @classmethod
+    def from_payload(cls, index: str, payload: Dict[str, Any], timestamp: float) -> 'IndexSnapshot':
+        # The first row of the NSE payload is the index itself
+        rows = [row for row in payload.get('data', []) if row.get('symbol') and row.get('symbol') != index]
+
+        def column(field: str) -> np.ndarray:
+            values = np.empty(len(rows))
+            for i, row in enumerate(rows):
+                try:
+                    values[i] = float(row.get(field))
+                except (TypeError, ValueError):
+                    values[i] = np.nan
+            return values
+
+        return cls(index, [row['symbol'] for row in rows], column('lastPrice'), column('change'),
+                   column('pChange'), column('totalTradedVolume'), timestamp)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'IndexSnapshot':
+        return cls(data['index'], data['symbols'], np.array(data['price'], dtype=float),
+                   np.array(data['change'], dtype=float), np.array(data['change_percent'], dtype=float),
+                   np.array(data['volume'], dtype=float), data['timestamp'])
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-safe form for the shared cache (NaN stored as None)."""
+        def values(column: np.ndarray) -> List[Optional[float]]:
+            return [None if np.isnan(v) else v for v in column.tolist()]
+        return {'index': self.index, 'symbols': self.symbols, 'price': values(self.price),
+                'change': values(self.change), 'change_percent': values(self.change_percent),
+                'volume': values(self.volume), 'timestamp': self.timestamp}
+
+    def top(self, kind: str, limit: int) -> List[Dict]:
+        """The `limit` best rows for `kind`, selected in O(n) and sorted only among themselves."""
+        key = self._keys[kind]
+        n = len(key)
+        if limit <= 0 or n == 0:
+            return []
+        if limit < n:
+            idx = np.argpartition(key, limit - 1)[:limit]
+        else:
+            idx = np.arange(n)
+        idx = idx[np.argsort(key[idx], kind='stable')]
+        idx = idx[np.isfinite(key[idx])]
+        return [self._record(i) for i in idx.tolist()]
+
+    def _record(self, i: int) -> Dict:
+        def number(column: np.ndarray) -> Optional[float]:
+            value = column[i]
+            return None if np.isnan(value) else float(value)
+        volume = number(self.volume)
+        return {
+            'symbol': self.symbols[i],
+            'name': self.symbols[i],
+            'price': number(self.price),
+            'change': number(self.change),
+            'change_percent': number(self.change_percent),
+            'volume': int(volume) if volume is not None else None,
+            'source': 'NSE',
+        }
+
+
+def fetch_index(index: str, timeout: float = FETCH_TIMEOUT) -> Dict[str, Any]:
+    """Raw NSE payload for one index, priming and renewing the session cookies as needed."""
+    # The NSE API rejects requests without the cookies its home page sets
+    if not http.has_cookies('nseindia.com'):
+        http.prime_cookies(NSE_HOME, timeout=timeout)
+    url = NSE_INDEX_URL.format(quote(index))
+    response = http.get(url, headers=NSE_HEADERS, timeout=timeout)
+    if response.status_code in (401, 403):
+        # Session cookies expired; renew them once
+        http.prime_cookies(NSE_HOME, timeout=timeout)
+        response = http.get(url, headers=NSE_HEADERS, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+class IndexMovers:
+    """Top gainers, losers and volume leaders for the configured indices.
+
+    A background thread pulls every index once per `interval`; queries only read the
+    in-memory snapshots. When CACHE_BACKEND is shared, workers reuse each other's pulls.
+    """
+
+    def __init__(self, indices: List[str] = INDICES, interval: float = REFRESH_INTERVAL):
+        self.indices = list(indices)
+        self.interval = interval
+        self._snapshots: Dict[str, IndexSnapshot] = {}
+        self._errors: Dict[str, str] = {}
+        self._shared = get_cache('index-movers', max_entries=len(self.indices) * 2 + 1)
+        self._flight = SingleFlight()
+        self._refresher: Optional[threading.Thread] = None
+        self._guard = threading.Lock()
+
+    def _fresh(self, index: str) -> bool:
+        snapshot = self._snapshots.get(index)
+        return snapshot is not None and time.time() - snapshot.timestamp < self.interval
+
+    def _refresh(self, index: str) -> Optional[IndexSnapshot]:
+        # Another worker may have pulled this index already, or be pulling it now
+        shared = self._shared.get(index)
+        if shared is not None and shared['timestamp'] > getattr(self._snapshots.get(index), 'timestamp', 0):
+            self._snapshots[index] = IndexSnapshot.from_dict(shared)
+        if self._fresh(index):
+            return self._snapshots.get(index)
+        with cache_lock(self._shared, f'refresh:{index}', REFRESH_LOCK_TTL) as locked:
+            if not locked:
+                return self._snapshots.get(index)
+            try:
+                snapshot = IndexSnapshot.from_payload(index, fetch_index(index), time.time())
+                if not snapshot.symbols:
+                    raise ValueError('empty payload')
+                self._snapshots[index] = snapshot
+                self._errors.pop(index, None)
+                self._shared.set(index, snapshot.to_dict(), ttl=self.interval * 10)
+                return snapshot
+            except Exception as e:
+                self._errors[index] = str(e)
+                logging.error(f'Failed to refresh {index} movers: {e}')
+                return self._snapshots.get(index)
+
+    def refresh(self, index: str) -> Optional[IndexSnapshot]:
+        """Re-pull `index` unless it is fresh; concurrent callers share one pull."""
+        return self._flight.do(index, lambda: self._refresh(index))
+
+    def refresh_all(self) -> None:
+        run_concurrently({index: (lambda index=index: self.refresh(index)) for index in self.indices},
+                         REFRESH_BUDGET)
+
+    def _refresh_loop(self) -> None:
+        while True:
+            self.refresh_all()
+            time.sleep(self.interval)
+
+    def start_refresher(self) -> None:
+        """Start the background thread that keeps every index fresh (idempotent)."""
+        with self._guard:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name='index-movers-refresher', daemon=True)
+            self._refresher.start()
+
+    def snapshot(self, index: str = DEFAULT_INDEX) -> Optional[IndexSnapshot]:
+        """Latest snapshot of `index`; only the first query of an index waits for NSE."""
+        if index not in self.indices:
+            raise ValueError(f"Unknown index '{index}'. Available: {', '.join(self.indices)}")
+        self.start_refresher()
+        snapshot = self._snapshots.get(index)
+        if snapshot is None:
+            snapshot = self.refresh(index)
+        return snapshot
+
+    def top(self, kind: str, index: str = DEFAULT_INDEX, limit: int = 10) -> List[Dict]:
+        if kind not in KINDS:
+            raise ValueError(f"Unknown kind '{kind}'. Use one of: {', '.join(KINDS)}")
+        snapshot = self.snapshot(index)
+        return snapshot.top(kind, limit) if snapshot is not None else []
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            'interval': self.interval,
+            'indices': {
+                index: {
+                    'constituents': len(self._snapshots[index].symbols) if index in self._snapshots else 0,
+                    'age_seconds': round(now - self._snapshots[index].timestamp, 1) if index in self._snapshots else None,
+                    'last_error': self._errors.get(index),
+                }
+                for index in self.indices
+            },
+            'upstream': self._flight.stats(),
+        }
+
+
+index_movers = IndexMovers()
@@ -0,0 +1,267 @@
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from features import fetch_history
+from prediction_batch import fetch_histories, normalize_symbols
+
+# Worker processes running forecasts; 0 runs them in the request thread instead
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', max(1, min(4, (os.cpu_count() or 2) - 1))))
+# Forecasts running or waiting for a worker before new ones are turned away
+INFERENCE_MAX_PENDING = int(os.getenv('INFERENCE_MAX_PENDING', INFERENCE_WORKERS * 4))
+# Longest a request waits for its forecast, queueing included
+INFERENCE_TIMEOUT = float(os.getenv('INFERENCE_TIMEOUT', 20))
+# Longest forecast horizon accepted; a worker runs a forecast to the end even after its
+# caller gave up, so huge horizons would hold admission slots long past the deadline
+MAX_FORECAST_DAYS = 365
+# spawn, because forking a process that already runs refresher threads can copy held locks
+START_METHOD = os.getenv('INFERENCE_START_METHOD', 'spawn')
+
+
+class PoolSaturated(Exception):
+    """Too many forecasts are queued; the request was turned away without waiting."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def check_days(days: int) -> None:
+    if not 1 <= days <= MAX_FORECAST_DAYS:
+        raise ValueError(f'days must be between 1 and {MAX_FORECAST_DAYS}')
+
+
+def _init_worker() -> None:
+    # Load every model once per worker so the first forecast it runs does not pay for it
+    from model_registry import registry
+    registry.warm()
+
+
+def _process_stats() -> Dict[str, Any]:
+    """This process's loaded models and forecast cache counters."""
+    from forecast_cache import forecast_cache
+    from model_registry import registry
+    return {'models': registry.stats(), 'forecast_cache': forecast_cache.stats()}
+
+
+# Workers only compute: the web process fetches history through its own store, upstream
+# breakers and refresh locks, and sends the frames along with the task. Each task hands
+# back the worker's stats with its result, since models and forecast cache live there
+
+def _predict(model_choice: int, symbol: str, days: int, period: str,
+             history: pd.DataFrame) -> Tuple[Dict[str, Any], int, Dict[str, Any]]:
+    if model_choice == 1:
+        from prediction_lstm import predict_price_lstm
+        result = predict_price_lstm(symbol, days=days, period=period, history=history)
+    else:
+        from prediction_xgb import predict_price_xgb
+        result = predict_price_xgb(symbol, days=days, period=period, history=history)
+    return result, os.getpid(), _process_stats()
+
+
+def _predict_batch(symbols: List[str], days: int, model_choice: int,
+                   histories: Dict[str, Any]) -> Tuple[Dict[str, Any], int, Dict[str, Any]]:
+    from prediction_batch import predict_price_batch
+    result = predict_price_batch(symbols, days=days, model_choice=model_choice, histories=histories)
+    return result, os.getpid(), _process_stats()
+
+
+def _merge_stats(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """One `/api/models` view over several processes' `_process_stats()`.
+
+    Each model shows its most recently loaded bundle and how many processes hold it;
+    cache counters are summed.
+    """
+    models: Dict[str, Dict[str, Any]] = {}
+    holders: Dict[str, int] = {}
+    for report in reports:
+        for name, info in report['models'].items():
+            holders[name] = holders.get(name, 0) + 1
+            if name not in models or info['loaded_at'] > models[name]['loaded_at']:
+                models[name] = info
+    models = {name: dict(info, processes=holders[name]) for name, info in models.items()}
+
+    caches = [report['forecast_cache'] for report in reports]
+    cache = dict(caches[-1]) if caches else {}
+    for counter in ('hits', 'disk_hits', 'misses'):
+        cache[counter] = sum(c[counter] for c in caches)
+    lookups = sum(cache.get(counter, 0) for counter in ('hits', 'disk_hits', 'misses'))
+    cache['hit_rate'] = round((cache.get('hits', 0) + cache.get('disk_hits', 0)) / lookups, 4) if lookups else 0.0
+    return {'models': models, 'forecast_cache': cache}
+
+
+class InferencePool:
+    """Forecasts run in a pool of worker processes with preloaded models.
+
+    The GIL-bound model code stays out of the web workers, at most `max_pending`
+    forecasts are admitted at once, and every caller waits no longer than its deadline
+    (history fetching included).
+    """
+
+    def __init__(self, workers: int = INFERENCE_WORKERS, max_pending: int = INFERENCE_MAX_PENDING,
+                 timeout: float = INFERENCE_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max(1, max_pending)
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._guard = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_seconds = 0.0
+        # Latest `_process_stats()` of each worker process, by pid
+        self._worker_stats: Dict[int, Dict[str, Any]] = {}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._guard:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(START_METHOD),
+                    initializer=_init_worker)
+            return self._executor
+
+    def retry_after(self) -> int:
+        """Seconds until a turned-away request is likely to find room."""
+        runs = self.completed + self.failed
+        avg = self.total_seconds / runs if runs else 1.0
+        return max(1, math.ceil(avg * self.pending / max(1, self.workers)))
+
+    def _admit(self) -> None:
+        if not self._slots.acquire(blocking=False):
+            with self._guard:
+                self.rejected += 1
+            raise PoolSaturated('Too many forecasts are in progress. Please try again shortly.', self.retry_after())
+        with self._guard:
+            self.pending += 1
+
+    def _finish(self, started: float, ok: Optional[bool]) -> None:
+        """Free the slot; `ok` is None for a forecast cancelled before it ran."""
+        with self._guard:
+            self.pending -= 1
+            if ok is not None:
+                self.total_seconds += time.perf_counter() - started
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+        self._slots.release()
+
+    def _run(self, fn: Callable[..., Any], load: Callable[[], Tuple], timeout: Optional[float] = None) -> Any:
+        """Admit the call, gather `fn`'s arguments with `load()` here, then run `fn` in a worker."""
+        self._admit()
+        started = time.perf_counter()
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            args = load()
+            if self.workers <= 0:
+                result = fn(*args)[0]
+                self._finish(started, True)
+                return result
+        except BaseException:
+            self._finish(started, False)
+            raise
+
+        executor = None
+        try:
+            executor = self._pool()
+            future = executor.submit(fn, *args)
+        except BaseException as e:
+            # Nothing was queued, so the slot is ours to free on any error
+            self._finish(started, False)
+            if isinstance(e, (RuntimeError, OSError)):
+                # A dead worker (BrokenProcessPool), a pool shut down under us or a failed spawn
+                self._reset(executor)
+            raise
+        # The slot is held until the worker is done, even if its caller gave up
+        future.add_done_callback(lambda f: self._done(f, started))
+
+        try:
+            return future.result(timeout=max(0.0, started + timeout - time.perf_counter()))[0]
+        except FutureTimeout:
+            future.cancel()  # Only works if it has not started yet
+            with self._guard:
+                self.timed_out += 1
+            raise TimeoutError(f'Forecast did not finish within {timeout:g}s') from None
+        except BrokenProcessPool:
+            self._reset(executor)
+            raise
+
+    def _done(self, future, started: float) -> None:
+        ok = None if future.cancelled() else future.exception() is None
+        if ok:
+            _, pid, stats = future.result()
+            with self._guard:
+                self._worker_stats[pid] = stats
+        self._finish(started, ok)
+
+    def _reset(self, executor: Optional[ProcessPoolExecutor]) -> None:
+        """Drop `executor` so the next call starts a fresh pool, unless it was already replaced."""
+        with self._guard:
+            if executor is None or self._executor is not executor:
+                return
+            self._executor = None
+            self._worker_stats.clear()
+        logging.error('Inference worker pool broke; starting a new one')
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def predict(self, model_choice: int, symbol: str, days: int = 7, period: str = '1y',
+                timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Forecast for one symbol, the same dict `predict_price_xgb` / `predict_price_lstm` return.
+
+        Raises PoolSaturated when the queue is full and TimeoutError past the deadline.
+        """
+        if not symbol:
+            raise ValueError('No symbol provided')
+        check_days(days)
+        return self._run(_predict, lambda: (model_choice, symbol, days, period, fetch_history(symbol, '1y')),
+                         timeout=timeout)
+
+    def predict_batch(self, symbols: List[str], days: int = 7, model_choice: int = 0,
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
+        check_days(days)
+        symbols = normalize_symbols(symbols)
+        return self._run(_predict_batch, lambda: (symbols, days, model_choice, fetch_histories(symbols)),
+                         timeout=timeout)
+
+    def model_stats(self) -> Dict[str, Any]:
+        """Loaded models and forecast cache counters of the processes that run forecasts.
+
+        With workers these are the reports each worker sent back with its latest forecast
+        (a worker shows up once it has run one); without, this process's own.
+        """
+        if self.workers <= 0:
+            return _merge_stats([_process_stats()])
+        with self._guard:
+            reports = dict(self._worker_stats)
+        merged = _merge_stats(list(reports.values()))
+        merged['workers'] = {str(pid): report for pid, report in sorted(reports.items())}
+        return merged
+
+    def stats(self) -> Dict[str, Any]:
+        with self._guard:
+            runs = self.completed + self.failed
+            return {
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+                'pending': self.pending,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'avg_ms': round(1000 * self.total_seconds / runs, 1) if runs else None,
+                'timeout': self.timeout,
+            }
+
+
+inference_pool = InferencePool()
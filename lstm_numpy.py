@@ -0,0 +1,127 @@
+"""
+NumPy-only inference for the pickled Keras LSTM in `model/lstm_model.pkl`.
+
+The weights are exported once into a compact `.npz`; loading that file needs only NumPy,
+so the web workers never import Keras/TensorFlow.
+
+Usage:
+    python lstm_numpy.py [model/lstm_model.pkl] [model/lstm_weights.npz]
+"""
+
+import os
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model')
+LSTM_PKL_PATH = os.path.join(MODEL_DIR, 'lstm_model.pkl')
+LSTM_NPZ_PATH = os.path.join(MODEL_DIR, 'lstm_weights.npz')
+
+_ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': lambda x: 1 / (1 + np.exp(-x)),
+}
+
+
+def export_lstm_weights(pkl_path: str = LSTM_PKL_PATH, npz_path: str = LSTM_NPZ_PATH) -> List[str]:
+    """Write the LSTM and Dense weights of the pickled Keras model to `npz_path`.
+
+    Dropout layers are inference no-ops and are skipped. Returns the exported layer layout.
+    """
+    import joblib  # the pickle needs Keras importable, only here
+
+    model = joblib.load(pkl_path)
+    arrays: Dict[str, np.ndarray] = {}
+    layout = []
+    for layer in model.layers:
+        kind = type(layer).__name__
+        config = layer.get_config()
+        if kind == 'Dropout':
+            continue
+        if kind == 'LSTM':
+            if config.get('activation') != 'tanh' or config.get('recurrent_activation') != 'sigmoid':
+                raise ValueError(f'Unsupported LSTM activations in layer {layer.name}')
+            kernel, recurrent, bias = layer.get_weights()
+            prefix = f'l{len(layout)}'
+            arrays[f'{prefix}_kernel'] = kernel
+            arrays[f'{prefix}_recurrent'] = recurrent
+            arrays[f'{prefix}_bias'] = bias
+            layout.append(f'lstm:{int(bool(config.get("return_sequences")))}')
+        elif kind == 'Dense':
+            activation = config.get('activation', 'linear')
+            if activation not in _ACTIVATIONS:
+                raise ValueError(f'Unsupported activation {activation} in layer {layer.name}')
+            kernel, bias = layer.get_weights()
+            prefix = f'l{len(layout)}'
+            arrays[f'{prefix}_kernel'] = kernel
+            arrays[f'{prefix}_bias'] = bias
+            layout.append(f'dense:{activation}')
+        else:
+            raise ValueError(f'Unsupported layer type {kind} in {pkl_path}')
+
+    arrays['layout'] = np.array(layout)
+    np.savez_compressed(npz_path, **arrays)
+    return layout
+
+
+class NumpyLSTM:
+    """Stacked LSTM/Dense network evaluated with NumPy, mirroring Keras inference."""
+
+    def __init__(self, npz_path: str = LSTM_NPZ_PATH):
+        with np.load(npz_path) as data:
+            self.layout = [str(item) for item in data['layout']]
+            self.weights = {key: data[key].astype(np.float32) for key in data.files if key != 'layout'}
+
+    def predict(self, X: np.ndarray, verbose: int = 0) -> np.ndarray:
+        """Score a `(k, time_steps, features)` batch; returns `(k, 1)` like `Sequential.predict`."""
+        out = np.asarray(X, dtype=np.float32)
+        for i, spec in enumerate(self.layout):
+            kind, arg = spec.split(':')
+            prefix = f'l{i}'
+            if kind == 'lstm':
+                out = self._lstm(out, self.weights[f'{prefix}_kernel'], self.weights[f'{prefix}_recurrent'],
+                                 self.weights[f'{prefix}_bias'], return_sequences=arg == '1')
+            else:
+                out = _ACTIVATIONS[arg](out @ self.weights[f'{prefix}_kernel'] + self.weights[f'{prefix}_bias'])
+        return out
+
+    @staticmethod
+    def _lstm(x: np.ndarray, kernel: np.ndarray, recurrent: np.ndarray, bias: np.ndarray,
+              return_sequences: bool) -> np.ndarray:
+        batch, steps, _ = x.shape
+        units = recurrent.shape[0]
+        # Input projections for every timestep in one matmul; gate order is i, f, c, o
+        projected = x @ kernel + bias
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        sequence = np.empty((batch, steps, units), dtype=np.float32) if return_sequences else None
+        sigmoid = _ACTIVATIONS['sigmoid']
+        for t in range(steps):
+            z = projected[:, t] + h @ recurrent
+            i = sigmoid(z[:, :units])
+            f = sigmoid(z[:, units:2 * units])
+            g = np.tanh(z[:, 2 * units:3 * units])
+            o = sigmoid(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            if return_sequences:
+                sequence[:, t] = h
+        return sequence if return_sequences else h
+
+
+def load_lstm(path: str):
+    """Registry loader: NumPy kernel for `.npz`, the Keras pickle otherwise."""
+    if path.endswith('.npz'):
+        return NumpyLSTM(path)
+    import joblib
+    return joblib.load(path)
+
+
+if __name__ == '__main__':
+    src = sys.argv[1] if len(sys.argv) > 1 else LSTM_PKL_PATH
+    dst = sys.argv[2] if len(sys.argv) > 2 else LSTM_NPZ_PATH
+    layers = export_lstm_weights(src, dst)
+    print(f'Exported {len(layers)} layers ({", ".join(layers)}) to {dst}')
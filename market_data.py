@@ -1,34 +1,231 @@
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Any, Iterator, Optional
 from stock_data import get_market_movers, format_large_number
+import json
+import os
+import threading
 import time
+from cache_backend import cache_lock, get_cache
+from movers_sources import sources
+
+# Largest list any page shows; smaller limits are sliced from the same snapshot
+MAX_LIMIT = 10
 
 # Cache for market data to prevent too frequent requests
 _cache = {
     'data': None,
     'timestamp': 0,
-    'cache_duration': 300  # Cache duration in seconds (5 minutes)
+    'cache_duration': 300,  # Cache duration in seconds (5 minutes)
+    'refresh_ahead': 60,  # Renew this many seconds before the snapshot expires
+    'last_duration': None,
+    'last_error': None,
 }
 
+# Shared with the other workers when CACHE_BACKEND is cross-process
+_shared = get_cache('movers', max_entries=8)
+REFRESH_LOCK_TTL = 30
+
+# Seconds between keep-alive comments on idle streams
+STREAM_HEARTBEAT = 15
+# Streams end after this long (the browser's EventSource reconnects on its own),
+# so a connection never holds a server worker indefinitely
+STREAM_MAX_LIFETIME = float(os.getenv('STREAM_MAX_LIFETIME', 300))
+# Every open stream occupies a server thread unless the app runs on gevent/eventlet workers,
+# so only a few are allowed then; STREAM_MAX_CLIENTS overrides either default
+STREAM_CLIENTS_THREADED = 8
+STREAM_CLIENTS_ASYNC = 1000
+STREAM_RETRY_AFTER = 30
+
+_refresh_lock = threading.Lock()
+_first_snapshot = threading.Event()
+# Set once the first caller's wait for the initial snapshot is over; nobody waits after that
+_first_wait_done = threading.Event()
+_refresher = None
+_refresher_guard = threading.Lock()
+
+# Streaming clients wait on this; each snapshot is serialized once for all of them
+_stream = threading.Condition()
+_stream_state = {'version': 0, 'event': None, 'clients': 0}
+
+
+def _publish(gainers: List[Dict], losers: List[Dict], timestamp: float) -> None:
+    """Store a snapshot and wake every streaming client."""
+    _cache['data'] = (gainers, losers)
+    _cache['timestamp'] = timestamp
+    payload = json.dumps({'gainers': gainers, 'losers': losers, 'timestamp': timestamp})
+    with _stream:
+        _stream_state['version'] += 1
+        # The id is the snapshot time, so it means the same thing on every worker
+        _stream_state['event'] = f'id: {timestamp}\nevent: movers\ndata: {payload}\n\n'
+        _stream.notify_all()
+    _first_snapshot.set()
+
+
+def _adopt_shared_snapshot() -> bool:
+    """Take over a fresher snapshot stored by another worker; True if it is still fresh."""
+    snapshot = _shared.get('snapshot')
+    if snapshot is None:
+        return False
+    if snapshot['timestamp'] > _cache['timestamp']:
+        _publish(snapshot['gainers'], snapshot['losers'], snapshot['timestamp'])
+    return time.time() - snapshot['timestamp'] < _cache['cache_duration'] - _cache['refresh_ahead']
+
+
+def refresh_market_movers() -> bool:
+    """Scrape a new snapshot unless a refresh is already running; True if one was stored."""
+    if not _refresh_lock.acquire(blocking=False):
+        return False
+    try:
+        # Another worker may have refreshed already, or be refreshing right now
+        if _adopt_shared_snapshot():
+            return False
+        with cache_lock(_shared, 'refresh-lock', REFRESH_LOCK_TTL) as locked:
+            if not locked:
+                return False
+            start = time.time()
+            try:
+                gainers, losers = get_market_movers(MAX_LIMIT)
+                _cache['last_duration'] = time.time() - start
+                if gainers and losers:  # Only update cache if we got valid data
+                    _publish(gainers, losers, time.time())
+                    _cache['last_error'] = None
+                    _shared.set('snapshot', {'gainers': gainers, 'losers': losers, 'timestamp': _cache['timestamp']})
+                    print(f"Market data refreshed at {time.strftime('%Y-%m-%d %H:%M:%S')} in {_cache['last_duration']:.1f}s")
+                    return True
+                _cache['last_error'] = 'No data returned by any source'
+            except Exception as e:
+                _cache['last_duration'] = time.time() - start
+                _cache['last_error'] = str(e)
+                print(f"Error refreshing market data: {str(e)}")
+        return False
+    finally:
+        _refresh_lock.release()
+
+
+def _refresh_loop() -> None:
+    while True:
+        refresh_market_movers()
+        if _cache['data'] is None:
+            delay = 30  # Keep trying until the first snapshot lands
+        else:
+            expires_in = _cache['timestamp'] + _cache['cache_duration'] - time.time()
+            delay = max(5, expires_in - _cache['refresh_ahead'])
+        time.sleep(delay)
+
+
+def start_refresher() -> None:
+    """Start the background thread that renews the snapshot ahead of expiry (idempotent)."""
+    global _refresher
+    with _refresher_guard:
+        if _refresher is not None and _refresher.is_alive():
+            return
+        _refresher = threading.Thread(target=_refresh_loop, name='market-movers-refresher', daemon=True)
+        _refresher.start()
+
+
 def get_market_movers_cached(limit: int = 10) -> Tuple[List[Dict], List[Dict]]:
-    """Get cached market movers data, refresh if cache is expired"""
-    global _cache
-    
-    current_time = time.time()
-    if _cache['data'] is None or (current_time - _cache['timestamp']) > _cache['cache_duration']:
-        try:
-            # Cache is empty or expired, fetch new data
-            gainers, losers = get_market_movers(limit)
-            if gainers and losers:  # Only update cache if we got valid data
-                _cache['data'] = (gainers, losers)
-                _cache['timestamp'] = current_time
-                print(f"Market data refreshed at {time.strftime('%Y-%m-%d %H:%M:%S')}")
-        except Exception as e:
-            print(f"Error refreshing market data: {str(e)}")
-            if _cache['data'] is None:  # If no cached data available, return empty lists
-                return [], []
-    
-    return _cache['data']
+    """Get the latest market movers snapshot without waiting on the scrapers.
+
+    Only the first calls in a process wait, for at most one refresh; if that
+    produced nothing, later calls get empty lists straight away.
+    """
+    start_refresher()
+    data = _cache['data']
+    if data is None:
+        if not _first_wait_done.is_set():
+            _first_snapshot.wait(timeout=15)
+            _first_wait_done.set()
+        data = _cache['data']
+        if data is None:  # If no cached data available, return empty lists
+            return [], []
+    elif time.time() - _cache['timestamp'] > _cache['cache_duration'] and not _refresh_lock.locked():
+        # The refresher fell behind; serve what we have and renew in the background
+        threading.Thread(target=refresh_market_movers, daemon=True).start()
+
+    gainers, losers = data
+    return gainers[:limit], losers[:limit]
+
+
+def _async_worker() -> bool:
+    """True under gevent or eventlet, where an idle stream costs a greenlet instead of a thread."""
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            return True
+    except ImportError:
+        pass
+    try:
+        from eventlet import patcher
+        return patcher.is_monkey_patched('thread')
+    except ImportError:
+        return False
+
+
+def stream_client_limit() -> int:
+    default = STREAM_CLIENTS_ASYNC if _async_worker() else STREAM_CLIENTS_THREADED
+    return int(os.getenv('STREAM_MAX_CLIENTS', default))
+
+
+def acquire_stream_slot() -> bool:
+    """Count a new streaming client in; False if the limit is reached. Pair with release_stream_slot."""
+    limit = stream_client_limit()
+    with _stream:
+        if _stream_state['clients'] >= limit:
+            return False
+        _stream_state['clients'] += 1
+        return True
+
+
+def release_stream_slot() -> None:
+    with _stream:
+        _stream_state['clients'] -= 1
+
+
+def stream_market_movers(last_event_id: Optional[str] = None) -> Iterator[str]:
+    """Server-Sent Events: the current snapshot, then each new one as the refresher stores it.
+
+    Idle clients only wait on a condition variable and get a comment every
+    STREAM_HEARTBEAT seconds, so their cost is one shared serialization per snapshot.
+    The stream ends after STREAM_MAX_LIFETIME seconds and the client reconnects.
+    """
+    start_refresher()
+    ends_at = time.monotonic() + STREAM_MAX_LIFETIME
+    yield 'retry: 5000\n\n'
+    with _stream:
+        version, event = _stream_state['version'], _stream_state['event']
+    # A reconnecting client that already has this snapshot only needs the next one
+    if event is not None and not (last_event_id and event.startswith(f'id: {last_event_id}\n')):
+        yield event
+    while True:
+        remaining = ends_at - time.monotonic()
+        if remaining <= 0:
+            return
+        with _stream:
+            _stream.wait_for(lambda: _stream_state['version'] != version, timeout=min(STREAM_HEARTBEAT, remaining))
+            latest, event = _stream_state['version'], _stream_state['event']
+        if latest == version:
+            yield ': keep-alive\n\n'
+        else:
+            version = latest
+            yield event
+
+
+def get_market_movers_status() -> Dict[str, Any]:
+    """Snapshot age and refresh timings for monitoring."""
+    timestamp = _cache['timestamp']
+    return {
+        'has_snapshot': _cache['data'] is not None,
+        'age_seconds': round(time.time() - timestamp, 1) if timestamp else None,
+        'cache_duration': _cache['cache_duration'],
+        'refreshing': _refresh_lock.locked(),
+        'last_refresh_seconds': round(_cache['last_duration'], 2) if _cache['last_duration'] is not None else None,
+        'last_error': _cache['last_error'],
+        'refresher_alive': _refresher is not None and _refresher.is_alive(),
+        'stream_clients': _stream_state['clients'],
+        'stream_client_limit': stream_client_limit(),
+        'sources': sources.stats(),
+    }
+
 
 def format_number_wrapper(num: float) -> str:
     """Wrapper for format_large_number from stock_data"""
-    return format_large_number(num)
\ No newline at end of file
+    return format_large_number(num)
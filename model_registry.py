@@ -0,0 +1,241 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+
+from features import FEATURES, TIME_STEP
+from lstm_numpy import LSTM_NPZ_PATH, LSTM_PKL_PATH, load_lstm
+from xgb_native import XGB_PKL_PATH, XGB_UBJ_PATH, export_booster, load_xgb
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model')
+SCALER_X_PATH = os.path.join(MODEL_DIR, 'scaler_X.pkl')
+SCALER_Y_PATH = os.path.join(MODEL_DIR, 'scaler_y.pkl')
+
+N_FEATURES = len(FEATURES)
+
+# How often (seconds) the artifact files are stat'ed for changes
+CHECK_INTERVAL = 5.0
+
+
+class ModelBundle:
+    """One loaded version of a model together with the scalers it was trained with.
+
+    Bundles are never mutated after they are built; a reload creates a new bundle and
+    swaps the registry reference, so callers holding the old one keep a consistent set.
+    """
+
+    def __init__(self, name: str, version: str, model: Any, scaler_X: Any, scaler_y: Any,
+                 files: Dict[str, float], load_seconds: float, warmup_seconds: float):
+        self.name = name
+        self.version = version
+        self.model = model
+        self.scaler_X = scaler_X
+        self.scaler_y = scaler_y
+        self.files = files
+        self.load_seconds = load_seconds
+        self.warmup_seconds = warmup_seconds
+        self.loaded_at = time.time()
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'version': self.version,
+            'files': [os.path.basename(p) for p in self.files],
+            'load_seconds': round(self.load_seconds, 4),
+            'warmup_seconds': round(self.warmup_seconds, 4),
+            'loaded_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.loaded_at)),
+        }
+
+
+def _file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _warmup_xgb(model: Any) -> None:
+    model.predict(np.zeros((1, TIME_STEP * N_FEATURES)))
+
+
+def _warmup_lstm(model: Any) -> None:
+    model.predict(np.zeros((1, TIME_STEP, N_FEATURES)), verbose=0)
+
+
+class ModelRegistry:
+    """Loads each model/scaler set once per process and hot-swaps it when the files change."""
+
+    def __init__(self, check_interval: float = CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._specs: Dict[str, Dict[str, Any]] = {}
+        self._current: Dict[str, ModelBundle] = {}
+        self._versions: Dict[Tuple[str, str], ModelBundle] = {}
+        self._last_check: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    def register(self, name: str, model_path: str, loader: Callable[[str], Any] = joblib.load,
+                 warmup: Optional[Callable[[Any], None]] = None, source_path: Optional[str] = None,
+                 export: Optional[Callable[[str, str], None]] = None) -> None:
+        """Declare a model; nothing is loaded until it is first requested.
+
+        `source_path` is the file `model_path` is exported from. It is watched as well, and
+        whenever the export is missing or older than it, `export(source_path, path)` writes
+        a fresh one; without `export`, or if that fails, the source itself is loaded.
+        """
+        with self._lock:
+            self._specs[name] = {
+                'model_path': model_path,
+                'source_path': source_path,
+                'loader': loader,
+                'warmup': warmup,
+                'export': export,
+                'stale_seen': None,
+            }
+            self._load_locks.setdefault(name, threading.Lock())
+
+    def _model_path(self, name: str) -> str:
+        spec = self._specs[name]
+        path, source = spec['model_path'], spec['source_path']
+        if source is None or not os.path.exists(source):
+            return path
+        exported = os.path.exists(path)
+        source_mtime = os.path.getmtime(source)
+        if exported and source_mtime <= os.path.getmtime(path):
+            return path
+        # Once per change of the source, so a failing export is not retried on every check
+        if spec['stale_seen'] != source_mtime:
+            spec['stale_seen'] = source_mtime
+            if spec['export'] is not None and self._export(name, source, path):
+                return path
+            if exported:
+                logging.warning(f'{os.path.basename(source)} is newer than {os.path.basename(path)}; '
+                                f'loading model {name} from it until it is re-exported')
+        return source
+
+    def _export(self, name: str, source: str, path: str) -> bool:
+        # Written aside and moved into place, so other processes never load a partial file
+        root, ext = os.path.splitext(path)
+        tmp = f'{root}.{os.getpid()}.tmp{ext}'
+        try:
+            self._specs[name]['export'](source, tmp)
+            os.replace(tmp, path)
+            # Never older than its source, even if the source's mtime is ahead of this clock
+            source_mtime = os.path.getmtime(source)
+            if os.path.getmtime(path) < source_mtime:
+                os.utime(path, (source_mtime, source_mtime))
+        except Exception as e:
+            logging.warning(f'Failed to re-export {os.path.basename(path)} from {os.path.basename(source)}: {e}')
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return False
+        logging.info(f'Re-exported {os.path.basename(path)} from {os.path.basename(source)} for model {name}')
+        return True
+
+    def _paths(self, name: str) -> Tuple[str, ...]:
+        return (self._model_path(name), SCALER_X_PATH, SCALER_Y_PATH)
+
+    def _mtimes(self, name: str) -> Dict[str, float]:
+        paths = self._paths(name)
+        if not all(os.path.exists(p) for p in paths):
+            raise FileNotFoundError('A required model or scaler file is missing.')
+        source = self._specs[name]['source_path']
+        if source is not None and os.path.exists(source):
+            paths += (source,)
+        return {p: os.path.getmtime(p) for p in paths}
+
+    def _version(self, name: str) -> str:
+        digest = hashlib.sha256()
+        for path in self._paths(name):
+            digest.update(_file_checksum(path).encode())
+        return digest.hexdigest()[:12]
+
+    def _load(self, name: str, mtimes: Dict[str, float], version: str) -> ModelBundle:
+        spec = self._specs[name]
+        start = time.perf_counter()
+        model = spec['loader'](self._model_path(name))
+        scaler_X = joblib.load(SCALER_X_PATH)
+        scaler_y = joblib.load(SCALER_Y_PATH)
+        load_seconds = time.perf_counter() - start
+
+        warmup_seconds = 0.0
+        if spec['warmup'] is not None:
+            start = time.perf_counter()
+            spec['warmup'](model)
+            warmup_seconds = time.perf_counter() - start
+
+        logging.info(f'Loaded model {name} version {version} in {load_seconds:.3f}s (warm-up {warmup_seconds:.3f}s)')
+        return ModelBundle(name, version, model, scaler_X, scaler_y, mtimes, load_seconds, warmup_seconds)
+
+    def get(self, name: str) -> ModelBundle:
+        """Return the current bundle for `name`, loading or reloading it if needed."""
+        if name not in self._specs:
+            raise KeyError(f'Unknown model: {name}')
+
+        now = time.monotonic()
+        bundle = self._current.get(name)
+        if bundle is not None and now - self._last_check.get(name, 0) < self.check_interval:
+            return bundle
+
+        with self._load_locks[name]:
+            # Another thread may have refreshed it while we waited
+            bundle = self._current.get(name)
+            if bundle is not None and time.monotonic() - self._last_check.get(name, 0) < self.check_interval:
+                return bundle
+
+            mtimes = self._mtimes(name)
+            self._last_check[name] = time.monotonic()
+            if bundle is not None and bundle.files == mtimes:
+                return bundle
+
+            # Files were touched; only reload when their contents actually changed
+            version = self._version(name)
+            if bundle is not None and bundle.version == version:
+                self._swap(ModelBundle(name, version, bundle.model, bundle.scaler_X, bundle.scaler_y,
+                                       mtimes, bundle.load_seconds, bundle.warmup_seconds))
+                return self._current[name]
+
+            new_bundle = self._versions.get((name, version)) or self._load(name, mtimes, version)
+            self._swap(new_bundle)
+            if bundle is not None:
+                logging.info(f'Model {name} hot-swapped from {bundle.version} to {version}')
+            return new_bundle
+
+    def _swap(self, bundle: ModelBundle) -> None:
+        with self._lock:
+            self._current[bundle.name] = bundle
+            # Keep only the current version per name; older ones live on in callers' references
+            for key in [k for k in self._versions if k[0] == bundle.name and k[1] != bundle.version]:
+                del self._versions[key]
+            self._versions[(bundle.name, bundle.version)] = bundle
+
+    def get_version(self, name: str, version: str) -> Optional[ModelBundle]:
+        return self._versions.get((name, version))
+
+    def warm(self, *names: str) -> None:
+        """Eagerly load the given models (all registered models by default)."""
+        for name in names or tuple(self._specs):
+            try:
+                self.get(name)
+            except Exception as e:
+                logging.error(f'Failed to warm model {name}: {e}')
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {name: bundle.info() for name, bundle in self._current.items()}
+
+
+registry = ModelRegistry()
+# Prefer the native Booster export over the sklearn pickle; a retrained pickle is
+# re-exported on the next check
+registry.register('xgb', XGB_UBJ_PATH, loader=load_xgb, warmup=_warmup_xgb, source_path=XGB_PKL_PATH,
+                  export=export_booster)
+# The exported NumPy weights avoid importing Keras; the pickle is used while they are
+# missing or older than it
+registry.register('lstm', LSTM_NPZ_PATH, loader=load_lstm, warmup=_warmup_lstm, source_path=LSTM_PKL_PATH)
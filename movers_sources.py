@@ -0,0 +1,288 @@
+import logging
+import threading
+import time
+from functools import partial
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fanout import run_concurrently
+from html_tables import has_class, table_rows
+from http_client import http
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8',
+}
+
+# Seconds a single source may take, and the whole refresh
+SOURCE_TIMEOUT = 8.0
+REFRESH_BUDGET = 10.0
+
+# A source failing this many refreshes in a row is skipped for COOLDOWN seconds,
+# doubling with each further failed probe up to MAX_COOLDOWN
+FAILURE_THRESHOLD = 3
+COOLDOWN = 60.0
+MAX_COOLDOWN = 900.0
+
+Movers = Tuple[List[Dict], List[Dict]]
+
+# Row selectors for each source's movers table
+SCREENER_ROWS = f'//table[{has_class("data-table")}]//tbody//tr'
+MONEYCONTROL_ROWS = f'//div[{has_class("bsr_table")}]//table//tbody//tr'
+INVESTING_ROWS = f'//table[{has_class("common-table")} and {has_class("js-top-instruments")}]/tbody/tr'
+
+
+def fetch_page(url: str, timeout: float = SOURCE_TIMEOUT) -> Optional[str]:
+    """GET a page, returning its HTML or None on a non-200 response."""
+    response = http.get(url, headers=HEADERS, timeout=timeout)
+    if response.status_code == 200:
+        return response.text
+    return None
+
+
+def safe_int(value: str) -> int:
+    """Safely convert a string to an integer, returning 0 on failure."""
+    try:
+        return int(value.replace(',', '').strip())
+    except ValueError:
+        return 0
+
+
+def parse_screener_rows(html: str) -> List[Dict]:
+    rows = table_rows(html, SCREENER_ROWS, anchor='data-table', limit=10)
+
+    stocks = []
+    for cols in rows:
+        if len(cols) >= 6:
+            stocks.append({
+                'symbol': cols[0].strip(),
+                'name': cols[1].strip(),
+                'price': float(cols[2].replace('₹', '').replace(',', '').strip()),
+                'change_percent': float(cols[3].replace('%', '').strip()),
+                'volume': int(cols[4].replace(',', '').strip()),
+                'source': 'Screener.in'
+            })
+    return stocks
+
+
+def parse_moneycontrol_rows(html: str) -> List[Dict]:
+    rows = table_rows(html, MONEYCONTROL_ROWS, anchor='bsr_table', limit=10)
+
+    stocks = []
+    for cols in rows:
+        if len(cols) >= 7:
+            stocks.append({
+                'symbol': cols[0].strip(),
+                'name': cols[1].strip(),
+                'price': float(cols[3].replace(',', '').strip()),
+                'change': float(cols[4].replace(',', '').strip()),
+                'change_percent': float(cols[5].replace('%', '').strip()),
+                'volume': safe_int(cols[6]),
+                'source': 'MoneyControl'
+            })
+    return stocks
+
+
+def parse_investing_rows(html: str) -> List[Dict]:
+    rows = table_rows(html, INVESTING_ROWS, anchor='js-top-instruments', limit=10)
+
+    stocks = []
+    for cells in rows:
+        if len(cells) >= 6:
+            stocks.append({
+                'symbol': cells[1].strip(),
+                'name': cells[1].strip(),
+                'price': float(cells[2].replace(',', '').strip()),
+                'change': float(cells[3].replace(',', '').strip()),
+                'change_percent': float(cells[4].strip().replace('%', '')),
+                'volume': int(cells[5].replace(',', '').replace('K', '000').replace('M', '000000').strip()),
+                'source': 'Investing.com'
+            })
+    return stocks
+
+
+def parse_screener_tables(html: str) -> Movers:
+    """Screener.in also lists gainers and losers together on one page."""
+    def parse_table(table_id: str) -> List[Dict]:
+        stocks = []
+        rows = table_rows(html, f'(//div[@id="{table_id}"])[1]//tr', anchor=f'id="{table_id}"', limit=11)
+        for cells in rows[1:]:  # Skip header row
+            if len(cells) >= 5:
+                stocks.append({
+                    'symbol': cells[0].strip(),
+                    'name': cells[1].strip(),
+                    'price': float(cells[2].replace(',', '').strip()),
+                    'change': float(cells[3].replace(',', '').strip()),
+                    'change_percent': float(cells[4].strip().replace('%', '')),
+                    'volume': int(cells[5].replace(',', '').strip() if len(cells) > 5 else 0),
+                    'source': 'Screener.in'
+                })
+        return stocks
+
+    return parse_table('top-gainers'), parse_table('top-losers')
+
+
+def split_pages(gainers_url: str, losers_url: str, parse_rows: Callable[[str], List[Dict]]):
+    """Page urls and parser for a source with separate gainers and losers pages."""
+    def parse(pages: Dict[str, str]) -> Movers:
+        gainers = parse_rows(pages[gainers_url]) if gainers_url in pages else []
+        losers = parse_rows(pages[losers_url]) if losers_url in pages else []
+        return gainers, losers
+    return [gainers_url, losers_url], parse
+
+
+def single_page(url: str, parse_tables: Callable[[str], Movers]):
+    """Page url and parser for a source listing gainers and losers on one page."""
+    def parse(pages: Dict[str, str]) -> Movers:
+        return parse_tables(pages[url]) if url in pages else ([], [])
+    return [url], parse
+
+
+class MoversSource:
+    """A site listing top gainers and losers, plus its health across refreshes."""
+
+    def __init__(self, name: str, urls: List[str], parse: Callable[[Dict[str, str]], Movers],
+                 timeout: float = SOURCE_TIMEOUT):
+        self.name = name
+        self.urls = urls
+        self.parse = parse
+        self.timeout = timeout
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.total_seconds = 0.0
+        self.last_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_success: Optional[float] = None
+        self.skip_until = 0.0
+
+    def state(self, now: float) -> str:
+        if self.consecutive_failures < FAILURE_THRESHOLD:
+            return 'closed'
+        return 'open' if now < self.skip_until else 'half-open'
+
+    def info(self, now: float) -> Dict:
+        attempts = self.successes + self.failures
+        return {
+            'name': self.name,
+            'state': self.state(now),
+            'successes': self.successes,
+            'failures': self.failures,
+            'success_rate': round(self.successes / attempts, 3) if attempts else None,
+            'avg_ms': round(1000 * self.total_seconds / attempts, 1) if attempts else None,
+            'last_ms': round(1000 * self.last_seconds, 1) if self.last_seconds is not None else None,
+            'last_error': self.last_error,
+            'last_success_age': round(now - self.last_success, 1) if self.last_success else None,
+            'skipped_for': round(self.skip_until - now, 1) if self.state(now) == 'open' else 0,
+        }
+
+
+def _timed_fetch(url: str, timeout: float) -> Tuple[Optional[str], float, Optional[str]]:
+    """(html, seconds, error) for one page; errors are returned rather than raised."""
+    start = time.monotonic()
+    try:
+        html = fetch_page(url, timeout)
+        return html, time.monotonic() - start, None if html else 'non-200 response'
+    except Exception as e:
+        return None, time.monotonic() - start, str(e)
+
+
+class SourceRegistry:
+    """Every movers source behind one fetch call, with per-source circuit breaking.
+
+    Sources that keep failing or timing out are skipped until their cooldown passes,
+    then probed once; the refresh budget and fetch workers go to the healthy ones.
+    """
+
+    def __init__(self):
+        self._sources: Dict[str, MoversSource] = {}
+        self._lock = threading.Lock()
+
+    def register(self, source: MoversSource) -> None:
+        self._sources[source.name] = source
+
+    def names(self) -> List[str]:
+        return list(self._sources)
+
+    def _select(self, names: Optional[List[str]], now: float) -> List[MoversSource]:
+        candidates = [self._sources[name] for name in (names if names is not None else self._sources)]
+        return [source for source in candidates if source.state(now) != 'open']
+
+    def _record(self, source: MoversSource, seconds: float, error: Optional[str]) -> None:
+        with self._lock:
+            now = time.time()
+            source.total_seconds += seconds
+            source.last_seconds = seconds
+            if error is None:
+                source.successes += 1
+                source.consecutive_failures = 0
+                source.last_error = None
+                source.last_success = now
+                return
+            source.failures += 1
+            source.consecutive_failures += 1
+            source.last_error = error
+            excess = source.consecutive_failures - FAILURE_THRESHOLD
+            if excess >= 0:
+                source.skip_until = now + min(MAX_COOLDOWN, COOLDOWN * 2 ** excess)
+                logging.warning(f'Movers source {source.name} failed {source.consecutive_failures} times in a row '
+                                f'({error}); skipping it for {source.skip_until - now:.0f}s')
+
+    def fetch(self, names: Optional[List[str]] = None, budget: float = REFRESH_BUDGET) -> Dict[str, Movers]:
+        """Fetch every page of the selected sources concurrently and parse what arrives in time.
+
+        Returns {source: (gainers, losers)} for the sources that were tried; skipped ones
+        are left out. A page that fails or misses its deadline contributes no rows and
+        counts against its source.
+        """
+        selected = self._select(names, time.time())
+        tasks, deadlines = {}, {}
+        for source in selected:
+            for url in source.urls:
+                tasks[(source.name, url)] = partial(_timed_fetch, url, source.timeout)
+                deadlines[(source.name, url)] = source.timeout
+        fetched = run_concurrently(tasks, budget, deadlines)
+
+        results = {}
+        for source in selected:
+            pages, seconds, error = {}, 0.0, None
+            for url in source.urls:
+                outcome = fetched.get((source.name, url))
+                if outcome is None:
+                    outcome = None, min(source.timeout, budget), 'timed out'
+                html, page_seconds, page_error = outcome
+                seconds = max(seconds, page_seconds)
+                if html:
+                    pages[url] = html
+                error = error or page_error
+
+            try:
+                results[source.name] = source.parse(pages)
+            except Exception as e:
+                results[source.name] = ([], [])
+                error = error or f'parse failed: {e}'
+            if error is None and not any(results[source.name]):
+                error = 'no rows parsed'
+            self._record(source, seconds, error)
+        return results
+
+    def stats(self) -> List[Dict]:
+        now = time.time()
+        with self._lock:
+            return [source.info(now) for source in self._sources.values()]
+
+
+sources = SourceRegistry()
+sources.register(MoversSource('Screener.in', *split_pages(
+    "https://www.screener.in/screens/666/nse-top-gainers/",
+    "https://www.screener.in/screens/667/nse-top-losers/",
+    parse_screener_rows)))
+sources.register(MoversSource('MoneyControl', *split_pages(
+    "https://www.moneycontrol.com/stocks/marketstats/nsegainer/index.php",
+    "https://www.moneycontrol.com/stocks/marketstats/nseloser/index.php",
+    parse_moneycontrol_rows)))
+sources.register(MoversSource('Investing.com', *split_pages(
+    "https://in.investing.com/equities/top-stock-gainers",
+    "https://in.investing.com/equities/top-stock-losers",
+    parse_investing_rows)))
+sources.register(MoversSource('Screener.in gainers-losers', *single_page(
+    "https://www.screener.in/screens/gainers-losers/", parse_screener_tables)))
@@ -0,0 +1,186 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from cache_backend import cache_lock, get_cache
+from config import NEWS_API_KEY
+from http_client import http
+
+NEWS_API_URL = "https://newsapi.org/v2/everything"
+
+# region -> (query, domains)
+FEEDS = {
+    # Indian stock market news from trusted media
+    'india': ("Indian stock market OR Sensex OR Nifty OR NSE OR BSE OR finance OR business",
+              "economictimes.indiatimes.com,moneycontrol.com,business-standard.com,livemint.com,financialexpress.com"),
+    # Global stock market news from reliable global media
+    'global': ("global stock market OR S&P 500 OR Nasdaq OR Dow Jones OR Wall Street",
+               "reuters.com,bloomberg.com,finance.yahoo.com,marketwatch.com,cnbc.com"),
+}
+
+# Feeds are re-pulled every NEWS_TTL seconds; older copies are still served until NEWS_MAX_STALE.
+# Two feeds every 30 minutes stays under NewsAPI's free 100 requests/day, as long as the
+# workers share one cache (CACHE_BACKEND=sqlite); with the memory backend each worker pulls its own
+NEWS_TTL = float(os.getenv('NEWS_TTL', 1800))
+NEWS_MAX_STALE = float(os.getenv('NEWS_MAX_STALE', 24 * 3600))
+# The prefetcher stops pulling once nobody has read the news for this long
+NEWS_IDLE_AFTER = float(os.getenv('NEWS_IDLE_AFTER', 3600))
+NEWS_TIMEOUT = 8.0
+PAGE_SIZE = 30
+# Articles kept per feed after merging refreshes
+MAX_ARTICLES = 60
+# The first view after a cold start waits this long for the initial pull
+FIRST_LOAD_WAIT = 2.0
+REFRESH_LOCK_TTL = 30
+
+
+def normalize_region(region: Optional[str]) -> str:
+    return 'india' if region == 'india' else 'global'
+
+
+def feed_key(region: str) -> str:
+    """Cache key for a region's feed; changing its query or domains starts a new feed."""
+    query, domains = FEEDS[region]
+    digest = hashlib.sha1(f'{query}|{domains}'.encode()).hexdigest()[:12]
+    return f'{region}:{digest}'
+
+
+def _keep(article: Dict) -> bool:
+    # Remove articles without images or from unwanted domains (like biztoc)
+    return bool(article.get('urlToImage')) and 'biztoc.com' not in (article.get('url') or '')
+
+
+def _identity(article: Dict) -> str:
+    return article.get('url') or (article.get('title') or '').strip().lower()
+
+
+def merge_articles(fresh: List[Dict], previous: List[Dict], limit: int = MAX_ARTICLES) -> List[Dict]:
+    """Newest first, each article once (by URL), keeping older ones the new page no longer lists."""
+    seen = set()
+    merged = []
+    for article in sorted(fresh + previous, key=lambda a: a.get('publishedAt') or '', reverse=True):
+        identity = _identity(article)
+        if identity and identity not in seen:
+            seen.add(identity)
+            merged.append(article)
+    return merged[:limit]
+
+
+class NewsFeed:
+    """NewsAPI results per region, kept fresh in the background while people read them.
+
+    Views read the cache only; a slow or failing NewsAPI just means the previous
+    articles are served a little longer.
+    """
+
+    def __init__(self, ttl: float = NEWS_TTL):
+        self.ttl = ttl
+        self._cache = get_cache('news', max_entries=len(FEEDS) * 2)
+        self._errors: Dict[str, str] = {}
+        self._loaded = {region: threading.Event() for region in FEEDS}
+        self._refresher: Optional[threading.Thread] = None
+        self._guard = threading.Lock()
+        self._last_read = 0.0
+        self._wake = threading.Event()
+
+    def _fetch(self, region: str) -> List[Dict]:
+        query, domains = FEEDS[region]
+        params = {
+            "q": query,
+            "language": "en",
+            "sortBy": "publishedAt",
+            "apiKey": NEWS_API_KEY,
+            "pageSize": PAGE_SIZE,
+            "domains": domains
+        }
+        response = http.get(NEWS_API_URL, params=params, timeout=NEWS_TIMEOUT)
+        data = response.json()
+        if response.status_code != 200 or data.get('status') == 'error':
+            raise ValueError(data.get('message') or f'HTTP {response.status_code}')
+        return [article for article in data.get('articles', []) if _keep(article)]
+
+    def refresh(self, region: str, force: bool = False) -> bool:
+        """Pull `region` from NewsAPI unless it is fresh or another worker is pulling it."""
+        key = feed_key(region)
+        entry = self._cache.get(key)
+        if not force and entry is not None and time.time() - entry['fetched_at'] < self.ttl:
+            self._loaded[region].set()
+            return False
+        with cache_lock(self._cache, f'refresh:{key}', REFRESH_LOCK_TTL) as locked:
+            if not locked:
+                return False
+            try:
+                articles = merge_articles(self._fetch(region), entry['articles'] if entry else [])
+                self._cache.set(key, {'articles': articles, 'fetched_at': time.time()}, ttl=NEWS_MAX_STALE)
+                self._errors.pop(region, None)
+                return True
+            except Exception as e:
+                self._errors[region] = str(e)
+                logging.error(f'Failed to refresh {region} news: {e}')
+                return False
+            finally:
+                self._loaded[region].set()
+
+    def _refresh_loop(self) -> None:
+        while True:
+            # An idle deployment spends no NewsAPI quota; the next read wakes the loop
+            if time.time() - self._last_read < NEWS_IDLE_AFTER:
+                for region in FEEDS:
+                    self.refresh(region)
+            # Wake often enough to renew each feed soon after it expires
+            self._wake.wait(timeout=max(5.0, min(60.0, self.ttl / 4)))
+            self._wake.clear()
+
+    def start_prefetcher(self) -> None:
+        """Start the background thread that keeps every feed fresh (idempotent)."""
+        with self._guard:
+            if self._refresher is not None and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name='news-prefetcher', daemon=True)
+            self._refresher.start()
+
+    def get(self, region: str) -> Tuple[List[Dict], Optional[float]]:
+        """(articles, age in seconds) for `region`, read from the cache.
+
+        Only the first view after start-up waits, at most FIRST_LOAD_WAIT seconds.
+        """
+        region = normalize_region(region)
+        self._last_read = time.time()
+        self.start_prefetcher()
+        entry = self._cache.get(feed_key(region))
+        if entry is None:
+            self._wake.set()
+            self._loaded[region].wait(timeout=FIRST_LOAD_WAIT)
+            entry = self._cache.get(feed_key(region))
+        if entry is None:
+            return [], None
+        if time.time() - entry['fetched_at'] >= self.ttl:
+            # Expired while nobody was reading; renew it now rather than at the next tick
+            self._wake.set()
+        return entry['articles'], time.time() - entry['fetched_at']
+
+    def image_urls(self) -> Set[str]:
+        """Image URLs of every cached article; the image proxy only fetches these."""
+        urls = set()
+        for region in FEEDS:
+            entry = self._cache.get(feed_key(region))
+            if entry is not None:
+                urls.update(article['urlToImage'] for article in entry['articles'] if article.get('urlToImage'))
+        return urls
+
+    def stats(self) -> Dict[str, Any]:
+        result = {}
+        for region in FEEDS:
+            entry = self._cache.get(feed_key(region))
+            result[region] = {
+                'articles': len(entry['articles']) if entry else 0,
+                'age_seconds': round(time.time() - entry['fetched_at'], 1) if entry else None,
+                'last_error': self._errors.get(region),
+            }
+        return result
+
+
+news_feed = NewsFeed()
@@ -0,0 +1,114 @@
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Union
+import logging
+from features import fetch_history
+from forecast import ForecastEngine, forecast_batch
+from forecast_cache import forecast_cache, forecast_key
+from model_registry import registry
+import prediction_lstm
+import prediction_xgb
+
+MAX_BATCH_SYMBOLS = 50
+MAX_FETCH_WORKERS = 8
+
+MODELS = {
+    0: ('xgb', 'xgb_model.pkl', prediction_xgb.predict_windows),
+    1: ('lstm', 'lstm_model.pkl', prediction_lstm.predict_windows),
+}
+
+
+def normalize_symbols(symbols: List[str]) -> List[str]:
+    """Stripped, de-duplicated symbols, validated against MAX_BATCH_SYMBOLS."""
+    symbols = list(dict.fromkeys(s.strip() for s in symbols if s and s.strip()))
+    if not symbols:
+        raise ValueError('No symbols provided')
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        raise ValueError(f'At most {MAX_BATCH_SYMBOLS} symbols can be predicted at once')
+    return symbols
+
+
+def fetch_histories(symbols: List[str]) -> Dict[str, Union[pd.DataFrame, Exception]]:
+    """1y history per symbol, or the exception its fetch raised."""
+    def fetch(symbol):
+        try:
+            return fetch_history(symbol, '1y')
+        except Exception as e:
+            return e
+
+    # Fetch all histories concurrently; each one is an independent upstream request
+    with ThreadPoolExecutor(max_workers=min(MAX_FETCH_WORKERS, len(symbols))) as pool:
+        futures = {symbol: pool.submit(fetch, symbol) for symbol in symbols}
+    return {symbol: future.result() for symbol, future in futures.items()}
+
+
+def predict_price_batch(symbols: List[str], days: int = 7, model_choice: int = 0,
+                        histories: Optional[Dict[str, Union[pd.DataFrame, Exception]]] = None) -> Dict[str, Any]:
+    """Recursive predictions for several symbols, scoring all of them in one model call per day.
+
+    Returns a JSON-serializable dict with keys: model, model_version, results, errors.
+    `results` maps each symbol to the same fields `predict_price_xgb` returns; symbols whose
+    history could not be fetched or is too short are reported in `errors` instead.
+    Pass `histories` (from `fetch_histories`) to skip the fetch.
+    """
+    symbols = normalize_symbols(symbols)
+    if model_choice not in MODELS:
+        raise ValueError(f'Unknown model: {model_choice}')
+
+    name, model_file, predict_windows = MODELS[model_choice]
+    bundle = registry.get(name)
+
+    if histories is None:
+        histories = fetch_histories(symbols)
+
+    def result(symbol, predictions, last_date, last_close):
+        return {
+            'symbol': symbol,
+            'model': model_file,
+            'model_version': bundle.version,
+            'predictions': predictions,
+            'last_date': last_date,
+            'last_close': last_close
+        }
+
+    results = {}
+    errors = {}
+    engines = []
+    pending = []
+    for symbol in symbols:
+        try:
+            history = histories[symbol]
+            if isinstance(history, Exception):
+                raise history
+            key = forecast_key(symbol, name, bundle.version, pd.to_datetime(history.index[-1]).strftime('%Y-%m-%d'))
+            cached = forecast_cache.get(key, days)
+            if cached is not None:
+                results[symbol] = result(symbol, cached['predictions'], cached['last_date'], cached['last_close'])
+                continue
+            engines.append(ForecastEngine(history, bundle.scaler_X, bundle.scaler_y))
+            pending.append((symbol, key))
+        except Exception as e:
+            logging.error(f'Batch prediction skipped {symbol}: {e}')
+            errors[symbol] = str(e)
+
+    # Only symbols without a cached forecast go through the model
+    if engines:
+        prices = forecast_batch(engines, days, lambda X: predict_windows(bundle.model, X))
+        for (symbol, key), engine, row in zip(pending, engines, prices):
+            predictions = [
+                {'x': (engine.last_date + pd.Timedelta(days=i)).strftime('%Y-%m-%d'), 'y': round(float(price), 4)}
+                for i, price in enumerate(row, start=1)
+            ]
+            last_date = engine.last_date.strftime('%Y-%m-%d')
+            forecast_cache.put(key, predictions, last_date, engine.last_close)
+            results[symbol] = result(symbol, predictions, last_date, engine.last_close)
+
+    # Keep the caller's symbol order
+    results = {symbol: results[symbol] for symbol in symbols if symbol in results}
+
+    return {
+        'model': model_file,
+        'model_version': bundle.version,
+        'results': results,
+        'errors': errors
+    }
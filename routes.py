@@ -1,25 +1,31 @@
 from flask import jsonify
-import yfinance as yf
 
 # ...existing code...
 
 
 
 
-from flask import render_template, jsonify, request, redirect, url_for, session, flash
-import yfinance as yf
+from flask import render_template, jsonify, request, redirect, url_for, session, flash, Response, send_file
 import requests
-import pandas as pd
 import numpy as np
 from app import app
-from prediction_xgb import predict_price_xgb
-from prediction_lstm import predict_price_lstm
-from market_data import get_market_movers_cached, format_number_wrapper
+from inference_pool import inference_pool, PoolSaturated, MAX_FORECAST_DAYS
+from history_store import history_store, HistoryNotFound, COLUMNS, INTERVALS
+from downsample import lttb_indices
+from api_response import (COLUMNAR_MIMETYPE, client_is_fresh, conditional_json, day_to_datetime, encode_deltas,
+                          encode_series, make_etag, not_modified, points_to_columns, wants_columnar)
+from http_client import http
+from upstream import CircuitOpen, upstream
+from index_movers import index_movers, DEFAULT_INDEX
+from news_feed import news_feed
+from image_cache import image_cache
+from market_data import (get_market_movers_cached, get_market_movers_status, stream_market_movers, format_number_wrapper,
+                         acquire_stream_slot, release_stream_slot, STREAM_RETRY_AFTER)
 from datetime import datetime
 import logging
 import time
+import os
 from auth import handle_login, handle_signup_request, handle_signup_otp, handle_password_reset, verify_reset_code, reset_user_password
-from config import NEWS_API_KEY
 
 @app.route('/about')
 def about():
@@ -146,26 +152,62 @@ def market_movers_api():
         return jsonify({
             'gainers': gainers,
             'losers': losers,
-            'timestamp': datetime.now().strftime('%H:%M:%S')
+            'timestamp': datetime.now().strftime('%H:%M:%S'),
+            'age_seconds': get_market_movers_status()['age_seconds']
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/market-movers/stream')
+def market_movers_stream():
+    """Push each new movers snapshot to the client (Server-Sent Events) instead of polling.
+
+    Each open stream holds a server thread unless the app runs on gevent or eventlet
+    workers, so the number of clients is capped; past the cap clients get 503 and poll.
+    """
+    if not acquire_stream_slot():
+        response = jsonify({'error': 'Too many live connections. Please retry later.'})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(STREAM_RETRY_AFTER)
+        return response
+    last_event_id = request.headers.get('Last-Event-ID')
+    response = Response(stream_market_movers(last_event_id), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs however the connection ends, even if the body was never iterated
+    response.call_on_close(release_stream_slot)
+    return response
+
+@app.route('/api/market-movers/status')
+def market_movers_status_api():
+    return jsonify(get_market_movers_status())
+
+@app.route('/api/news/status')
+def news_status_api():
+    return jsonify(news_feed.stats())
+
+@app.route('/api/http-metrics')
+def http_metrics_api():
+    """Per-host latency and connection reuse of the shared HTTP client."""
+    return jsonify(http.metrics())
+
+
+@app.route('/api/upstream/status')
+def upstream_status_api():
+    """Circuit breaker state per upstream host and pending background retries."""
+    return jsonify(upstream.stats())
+
+
+def _upstream_unavailable(e: CircuitOpen):
+    response = jsonify({'error': f'Market data provider is unavailable right now. Please try again in {e.retry_after:.0f} seconds.'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(int(np.ceil(e.retry_after)))
+    return response
+
 # Stocks page
 @app.route('/stocks')
 def stocks():
     return render_template('stocks.html')
 
-# Top gainers page
-@app.route('/top-gainers')
-def top_gainers():
-    return render_template('top_gainers.html')
-
-# Top losers page
-@app.route('/top-losers')
-def top_losers():
-    return render_template('top_losers.html')
-
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -226,15 +268,53 @@ def research_yearbooks():
 def research_wallchart():
     return render_template('research/wallchart.html')
 
+def _index_movers_args():
+    index = request.args.get('index', DEFAULT_INDEX)
+    limit = max(1, min(request.args.get('limit', 10, type=int), 500))
+    return index, limit
+
+# Top gainers page
 @app.route('/top-gainers')
-def top_gainers_page():
-    gainers, _ = fetch_nse_data()
-    return render_template('screener/top_gainers.html', gainers=gainers)
+def top_gainers():
+    index, limit = _index_movers_args()
+    try:
+        gainers = index_movers.top('gainers', index, limit)
+    except ValueError:
+        gainers = []
+    return render_template('movers.html', title='Top Gainers', stocks=gainers, index=index,
+                           indices=index_movers.indices, format_number=format_number_wrapper)
 
+# Top losers page
 @app.route('/top-losers')
-def top_losers_page():
-    _, losers = fetch_nse_data()
-    return render_template('screener/top_losers.html', losers=losers)
+def top_losers():
+    index, limit = _index_movers_args()
+    try:
+        losers = index_movers.top('losers', index, limit)
+    except ValueError:
+        losers = []
+    return render_template('movers.html', title='Top Losers', stocks=losers, index=index,
+                           indices=index_movers.indices, format_number=format_number_wrapper)
+
+@app.route('/api/index-movers')
+def index_movers_api():
+    """Top-k gainers, losers or volume leaders of an NSE index from the in-memory snapshot."""
+    index, limit = _index_movers_args()
+    kind = request.args.get('kind', 'gainers')
+    try:
+        stocks = index_movers.top(kind, index, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    snapshot = index_movers.snapshot(index)
+    return jsonify({
+        'index': index,
+        'kind': kind,
+        'stocks': stocks,
+        'age_seconds': round(time.time() - snapshot.timestamp, 1) if snapshot is not None else None,
+    })
+
+@app.route('/api/index-movers/status')
+def index_movers_status_api():
+    return jsonify(index_movers.stats())
 
 @app.route('/demat-guide')
 def demat_guide():
@@ -244,42 +324,27 @@ def demat_guide():
 @app.route('/news')
 def news():
     region = request.args.get('region', 'india')
+    # Served from the background-refreshed cache; NewsAPI is never called per view
+    articles, _ = news_feed.get(region)
+    return render_template("news.html", articles=articles, region=region)
 
-    if region == "india":
-        # Indian stock market news from trusted media
-        url = "https://newsapi.org/v2/everything"
-        query = "Indian stock market OR Sensex OR Nifty OR NSE OR BSE OR finance OR business"
-        params = {
-            "q": query,
-            "language": "en",
-            "sortBy": "publishedAt",
-            "apiKey": NEWS_API_KEY,
-            "pageSize": 30,
-            "domains": "economictimes.indiatimes.com,moneycontrol.com,business-standard.com,livemint.com,financialexpress.com"
-        }
-    else:
-        # Global stock market news from reliable global media
-        url = "https://newsapi.org/v2/everything"
-        query = "global stock market OR S&P 500 OR Nasdaq OR Dow Jones OR Wall Street"
-        params = {
-            "q": query,
-            "language": "en",
-            "sortBy": "publishedAt",
-            "apiKey": NEWS_API_KEY,
-            "pageSize": 30,
-            "domains": "reuters.com,bloomberg.com,finance.yahoo.com,marketwatch.com,cnbc.com"
-        }
-
-    response = requests.get(url, params=params)
-    data = response.json()
-
-    # Filter: remove articles without images or from unwanted domains (like biztoc)
-    articles = [
-        a for a in data.get("articles", [])
-        if a.get("urlToImage") and "biztoc.com" not in (a.get("url") or "")
-    ]
+NEWS_IMAGE_FALLBACK = os.path.join(app.static_folder, 'images', 'default-stock.webp')
 
-    return render_template("news.html", articles=articles, region=region)
+@app.route('/news/image')
+def news_image():
+    """Article image as a locally cached thumbnail, or the default image if it cannot be fetched."""
+    url = request.args.get('url', '')
+    # Only proxy images of articles we are showing, so this is not an open proxy
+    if url.startswith(('http://', 'https://')) and url in news_feed.image_urls():
+        cached = image_cache.get(url)
+        if cached is not None:
+            path, mimetype = cached
+            return send_file(path, mimetype=mimetype, max_age=30 * 24 * 3600)
+    return send_file(NEWS_IMAGE_FALLBACK, mimetype='image/webp', max_age=3600)
+
+@app.route('/api/news/images/status')
+def news_images_status_api():
+    return jsonify(image_cache.stats())
 
 # Error handlers
 @app.errorhandler(404)
@@ -290,142 +355,176 @@ def not_found_error(error):
 def internal_error(error):
     return render_template('errors/500.html'), 500
 
-# Helper function for NSE data
-def fetch_nse_data():
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0',
-            'Accept': 'application/json'
-        }
-        url = "https://www.nseindia.com/api/equity-stockIndices?index=NIFTY%2050"
-        response = requests.get(url, headers=headers, timeout=5)
-        data = response.json()['data']
-        
-        stocks = []
-        for stock in data:
-            stocks.append({
-                'name': stock['symbol'],
-                'symbol': stock['symbol'],
-                'price': stock['lastPrice'],
-                'change': f"{stock['pChange']}%",
-                'volume': f"{int(stock['totalTradedVolume']/1000000)}M"
-            })
-        
-        gainers = sorted(stocks, key=lambda x: float(x['change'].strip('%')), reverse=True)[:10]
-        losers = sorted(stocks, key=lambda x: float(x['change'].strip('%')))[:10]
-        return gainers, losers
-    except Exception as e:
-        print(f"Error fetching data: {e}")
-        return [], []
+CLOSE_ROW = COLUMNS.index('Close')
+
+def _epoch_day(value):
+    """'YYYY-MM-DD' -> days since 1970-01-01, or None if not given."""
+    return int(np.datetime64(value, 'D').astype(np.int64)) if value else None
+
 # API endpoint for historical stock data (all time)
 @app.route('/api/stock-history')
 def stock_history():
     symbol = request.args.get('symbol')
     period = request.args.get('period', 'max')
+    max_points = request.args.get('max_points', type=int)
+    # 1wk and 1mo read precomputed bars; asking for any interval adds open/high/low/volume
+    interval = request.args.get('interval')
     if not symbol:
         return jsonify({'error': 'No symbol provided'}), 400
+    if max_points is not None and max_points < 3:
+        return jsonify({'error': 'max_points must be at least 3'}), 400
+    if interval is not None and interval not in INTERVALS:
+        return jsonify({'error': f"interval must be one of: {', '.join(INTERVALS)}"}), 400
+    if interval is not None and max_points is not None:
+        # Thinning picks single bars, so the candles left would miss the highs, lows and volume in between
+        return jsonify({'error': 'max_points cannot be combined with interval; use interval=1wk or 1mo for long ranges'}), 400
+
+    # Date ranges are cut from the stored bars: start/end are inclusive. since is the date of the
+    # client's last point and is inclusive too, because that bar (or week/month bucket) may still
+    # have been moving when the client got it; the client replaces its last point with the first one
+    try:
+        start = _epoch_day(request.args.get('start'))
+        end = _epoch_day(request.args.get('end'))
+        since = _epoch_day(request.args.get('since'))
+    except ValueError:
+        return jsonify({'error': 'start, end and since must be dates like YYYY-MM-DD'}), 400
+    if since is not None:
+        start = since if start is None else max(start, since)
+    ranged = start is not None or end is not None
     
-    max_retries = 3
-    retry_delay = 1  # seconds
-    
-    for attempt in range(max_retries):
-        try:
-            logging.info(f"Fetching stock history for {symbol} with period {period} (attempt {attempt + 1}/{max_retries})")
-            
-            # Configure yfinance session with proper headers
-            ticker = yf.Ticker(symbol)
-            ticker.session.headers.update({
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'gzip, deflate',
-                'Connection': 'keep-alive'
-            })
-            
-            # yfinance supports: 1d,5d,1mo,3mo,6mo,ytd,1y,2y,5y,10y,max
-            hist = ticker.history(period=period, timeout=15)
-            logging.info(f"Raw history shape for {symbol}: {hist.shape}")
-            
-            if hist is None or hist.empty:
-                logging.warning(f"Stock history API: Empty history returned from yfinance for {symbol}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay * (attempt + 1))  # Exponential backoff
-                    continue
-                return jsonify({'error': f'No data available for {symbol}. The symbol may be invalid or delisted.'}), 404
-            
-            # Validate required columns exist
-            if 'Close' not in hist.columns:
-                logging.error(f"Stock history API: 'Close' column not found in data for {symbol}")
-                return jsonify({'error': f'Invalid data structure for {symbol}'}), 400
-            
-            # Filter valid data points
-            data = []
-            for date, row in hist.iterrows():
-                try:
-                    close_price = float(row['Close'])
-                    # Skip NaN, None, and inf values
-                    if pd.isna(close_price) or not np.isfinite(close_price):
-                        continue
-                    data.append({
-                        'x': date.strftime('%Y-%m-%d'),
-                        'y': close_price
-                    })
-                except (ValueError, TypeError) as e:
-                    logging.debug(f"Skipping invalid data point for {symbol} on {date}: {e}")
-                    continue
-            
-            if not data:
-                logging.warning(f"Stock history API: No valid price data for {symbol} after filtering")
-                return jsonify({'error': f'No valid price data for {symbol}'}), 404
-            
-            logging.info(f"Successfully fetched {len(data)} valid data points for {symbol}")
-            return jsonify({'symbol': symbol, 'history': data})
-            
-        except requests.exceptions.Timeout as e:
-            logging.error(f"Timeout fetching {symbol} (attempt {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay * (attempt + 1))
-                continue
-            return jsonify({'error': f'Request timeout: Unable to fetch data for {symbol}. The server is taking too long. Please try again.'}), 504
-            
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Network error fetching {symbol} (attempt {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay * (attempt + 1))
-                continue
-            return jsonify({'error': f'Network error: Unable to fetch data for {symbol}. Please check your internet connection.'}), 503
-            
-        except ValueError as e:
-            logging.error(f"Value error for {symbol}: {e}")
-            return jsonify({'error': f'Invalid data received for {symbol}: {str(e)}'}), 400
-            
-        except Exception as e:
-            logging.error(f"Unexpected error fetching {symbol} (attempt {attempt + 1}/{max_retries}): {type(e).__name__} - {str(e)}", exc_info=True)
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay * (attempt + 1))
-                continue
-            return jsonify({'error': f'Failed to fetch data for {symbol}: {str(e)}'}), 500
-    
-    return jsonify({'error': f'Failed to fetch data for {symbol} after {max_retries} attempts. Please try again later.'}), 500
+    try:
+        logging.info(f"Fetching stock history for {symbol} with period {period}")
+
+        # Served from the local store; only bars newer than the last stored day go upstream
+        columns = history_store.get_columns(symbol, period, start, end, interval or '1d')
+        logging.info(f"History shape for {symbol}: {columns.shape}")
+
+        if columns.shape[1] == 0:
+            if ranged:
+                # Nothing new (or nothing in the window) is an answer, not an error
+                if wants_columnar():
+                    return jsonify({'symbol': symbol, 'format': 'columnar', 'history': encode_series([], [])})
+                return jsonify({'symbol': symbol, 'history': []})
+            logging.warning(f"Stock history API: Empty history for {symbol}")
+            return jsonify({'error': f'No data available for {symbol}. The symbol may be invalid or delisted.'}), 404
+
+        # The last bar (and its close, which moves intraday) identifies this version of the series
+        columnar = wants_columnar()
+        etag = make_etag(symbol, period, start, end, max_points, interval, columnar,
+                         columns.shape[1], columns[0, -1], columns[CLOSE_ROW, -1])
+        last_modified = day_to_datetime(columns[0, -1])
+        if client_is_fresh(etag, last_modified):
+            return not_modified(etag, last_modified)
+
+        # Skip bars with a NaN or inf close
+        columns = columns[:, np.isfinite(columns[CLOSE_ROW])]
+        days = columns[0]
+        close = columns[CLOSE_ROW]
+
+        if len(close) == 0 and not ranged:
+            logging.warning(f"Stock history API: No valid price data for {symbol} after filtering")
+            return jsonify({'error': f'No valid price data for {symbol}'}), 404
+
+        # Optionally thin long histories to what the chart can draw, keeping its shape
+        if max_points is not None and len(close) > max_points:
+            keep = lttb_indices(days, close, max_points)
+            days, close = days[keep], close[keep]
+
+        if interval is not None:
+            # A missing open/high/low falls back to the close so every candle can be drawn
+            open_, high, low = (np.where(np.isfinite(row), row, close) for row in columns[1:CLOSE_ROW])
+            volume = np.nan_to_num(columns[CLOSE_ROW + 1])
+
+        logging.info(f"Successfully fetched {len(close)} valid data points for {symbol}")
+        if columnar:
+            def build_columnar():
+                history = encode_series(days, close)
+                if interval is not None:
+                    history['interval'] = interval
+                    for name, values in (('open', open_), ('high', high), ('low', low)):
+                        history[name] = encode_deltas(values, history['scale'])
+                    history['volume'] = encode_deltas(volume)
+                return {'symbol': symbol, 'format': 'columnar', 'history': history}
+            return conditional_json(build_columnar, etag, last_modified, mimetype=COLUMNAR_MIMETYPE)
+
+        def build():
+            dates = np.datetime_as_string(days.astype('datetime64[D]')).tolist()
+            if interval is None:
+                return {'symbol': symbol, 'history': [{'x': x, 'y': y} for x, y in zip(dates, close.tolist())]}
+            return {'symbol': symbol, 'interval': interval, 'history': [
+                {'x': x, 'y': c, 'o': o, 'h': h, 'l': l, 'c': c, 'v': int(v)}
+                for x, o, h, l, c, v in zip(dates, open_.tolist(), high.tolist(), low.tolist(),
+                                            close.tolist(), volume.tolist())
+            ]}
+        return conditional_json(build, etag, last_modified)
+
+    except HistoryNotFound as e:
+        logging.warning(f"Stock history API: {e}")
+        return jsonify({'error': f'No data available for {symbol}. The symbol may be invalid or delisted.'}), 404
+
+    except CircuitOpen as e:
+        logging.warning(f"Stock history API: {e}")
+        return _upstream_unavailable(e)
+
+    except requests.exceptions.Timeout as e:
+        logging.error(f"Timeout fetching {symbol}: {e}")
+        return jsonify({'error': f'Request timeout: Unable to fetch data for {symbol}. The server is taking too long. Please try again.'}), 504
+
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Network error fetching {symbol}: {e}")
+        return jsonify({'error': f'Network error: Unable to fetch data for {symbol}. Please check your internet connection.'}), 503
+
+    except ValueError as e:
+        logging.error(f"Value error for {symbol}: {e}")
+        return jsonify({'error': f'Invalid data received for {symbol}: {str(e)}'}), 400
+
+    except Exception as e:
+        logging.error(f"Unexpected error fetching {symbol}: {type(e).__name__} - {str(e)}", exc_info=True)
+        return jsonify({'error': f'Failed to fetch data for {symbol}: {str(e)}'}), 500
+
 
+def _forecast_days():
+    """The `days` argument, or None unless it is a whole number of days from 1 to MAX_FORECAST_DAYS."""
+    value = request.args.get('days', '7')
+    if not value.isdigit() or not 1 <= int(value) <= MAX_FORECAST_DAYS:
+        return None
+    return int(value)
+
+_DAYS_ERROR = f'days must be a whole number from 1 to {MAX_FORECAST_DAYS}'
 
 @app.route('/api/predict')
 def predict_api():
     symbol = request.args.get('symbol')
-    days = int(request.args.get('days', 7))
+    days = _forecast_days()
     period = request.args.get('period', '1y')
     # Use model from app config, but allow override from request
     model_choice = int(request.args.get('model', app.config.get('DEFAULT_MODEL', 0)))
 
     if not symbol:
         return jsonify({'error': 'No symbol provided'}), 400
+    if days is None:
+        return jsonify({'error': _DAYS_ERROR}), 400
 
     try:
-        if model_choice == 1:
-            result = predict_price_lstm(symbol, days=days, period=period)
-        else:
-            result = predict_price_xgb(symbol, days=days, period=period)
-        return jsonify(result)
+        # Runs in an inference worker process, so the model code never blocks this one
+        result = inference_pool.predict(model_choice, symbol, days=days, period=period)
+
+        # A forecast only changes with a new bar or a new model version
+        columnar = wants_columnar()
+        etag = make_etag(symbol, model_choice, result['model_version'], days, result['last_date'],
+                         result['last_close'], columnar)
+        last_modified = day_to_datetime(np.datetime64(result['last_date'], 'D').astype(np.int64))
+        if columnar:
+            def build():
+                compact = dict(result, format='columnar')
+                compact['predictions'] = encode_series(*points_to_columns(result['predictions']))
+                return compact
+            return conditional_json(build, etag, last_modified, mimetype=COLUMNAR_MIMETYPE)
+        return conditional_json(lambda: result, etag, last_modified)
+    except CircuitOpen as e:
+        return _upstream_unavailable(e)
+    except (PoolSaturated, TimeoutError) as e:
+        return _inference_busy(e)
     except FileNotFoundError as e:
         return jsonify({'error': str(e)}), 500
     except ModuleNotFoundError as e:
@@ -434,3 +533,54 @@ def predict_api():
         return jsonify({'error': str(e)}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+
+
+@app.route('/api/predict/batch')
+def predict_batch_api():
+    symbols = request.args.get('symbols', '')
+    days = _forecast_days()
+    model_choice = int(request.args.get('model', app.config.get('DEFAULT_MODEL', 0)))
+
+    symbol_list = [s for s in symbols.split(',') if s.strip()]
+    if not symbol_list:
+        return jsonify({'error': 'No symbols provided'}), 400
+    if days is None:
+        return jsonify({'error': _DAYS_ERROR}), 400
+
+    try:
+        return jsonify(inference_pool.predict_batch(symbol_list, days=days, model_choice=model_choice))
+    except (PoolSaturated, TimeoutError) as e:
+        return _inference_busy(e)
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 500
+    except ModuleNotFoundError as e:
+        return jsonify({'error': f'Failed to load model: {e}. Check environment.'}), 500
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/models')
+def models_api():
+    """Loaded model versions with their load and warm-up timings, plus forecast cache counters.
+
+    Models and the forecast cache live in the inference workers, so this reports theirs.
+    """
+    return jsonify(inference_pool.model_stats())
+
+
+@app.route('/api/inference/status')
+def inference_status_api():
+    """Inference worker pool load: queued and running forecasts, rejections and timeouts."""
+    return jsonify(inference_pool.stats())
+
+
+def _inference_busy(e: Exception):
+    # Saturated and over-deadline both mean "come back shortly"
+    retry_after = e.retry_after if isinstance(e, PoolSaturated) else inference_pool.retry_after()
+    response = jsonify({'error': str(e)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(int(retry_after))
+    return response
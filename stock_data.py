@@ -1,147 +1,32 @@
-import requests
-from bs4 import BeautifulSoup
-import time
 from typing import List, Dict, Tuple
+from movers_sources import sources
+
+# Sources merged for the home page; the others in the registry serve nsetool
+HOME_SOURCES = ['Screener.in', 'MoneyControl']
+
 
 def get_screener_data() -> Tuple[List[Dict], List[Dict]]:
     """Fetch data from Screener.in"""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
-    }
-    
-    gainers = []
-    losers = []
-    
-    try:
-        # Top Gainers
-        url = "https://www.screener.in/screens/666/nse-top-gainers/"
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            rows = soup.select('table.data-table tbody tr')
-            
-            for row in rows[:10]:
-                cols = row.find_all('td')
-                if len(cols) >= 6:
-                    gainers.append({
-                        'symbol': cols[0].text.strip(),
-                        'name': cols[1].text.strip(),
-                        'price': float(cols[2].text.replace('₹', '').replace(',', '').strip()),
-                        'change_percent': float(cols[3].text.replace('%', '').strip()),
-                        'volume': int(cols[4].text.replace(',', '').strip()),
-                        'source': 'Screener.in'
-                    })
-        
-        # Top Losers
-        url = "https://www.screener.in/screens/667/nse-top-losers/"
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            rows = soup.select('table.data-table tbody tr')
-            
-            for row in rows[:10]:
-                cols = row.find_all('td')
-                if len(cols) >= 6:
-                    losers.append({
-                        'symbol': cols[0].text.strip(),
-                        'name': cols[1].text.strip(),
-                        'price': float(cols[2].text.replace('₹', '').replace(',', '').strip()),
-                        'change_percent': float(cols[3].text.replace('%', '').strip()),
-                        'volume': int(cols[4].text.replace(',', '').strip()),
-                        'source': 'Screener.in'
-                    })
-                    
-    except Exception as e:
-        print(f"Error fetching Screener.in data: {str(e)}")
-    
-    return gainers, losers
+    return sources.fetch(['Screener.in']).get('Screener.in', ([], []))
 
-def safe_int(value: str) -> int:
-    """Safely convert a string to an integer, returning 0 on failure."""
-    try:
-        return int(value.replace(',', '').strip())
-    except ValueError:
-        return 0
 
 def get_moneycontrol_data() -> Tuple[List[Dict], List[Dict]]:
     """Fetch data from MoneyControl"""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
-    }
-    
-    gainers = []
-    losers = []
-    
-    try:
-        # Top Gainers
-        url = "https://www.moneycontrol.com/stocks/marketstats/nsegainer/index.php"
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            rows = soup.select('div.bsr_table table tbody tr')
-            
-            for row in rows[:10]:
-                cols = row.find_all('td')
-                if len(cols) >= 7:
-                    gainers.append({
-                        'symbol': cols[0].text.strip(),
-                        'name': cols[1].text.strip(),
-                        'price': float(cols[3].text.replace(',', '').strip()),
-                        'change': float(cols[4].text.replace(',', '').strip()),
-                        'change_percent': float(cols[5].text.replace('%', '').strip()),
-                        'volume': safe_int(cols[6].text),
-                        'source': 'MoneyControl'
-                    })
-        
-        # Top Losers
-        url = "https://www.moneycontrol.com/stocks/marketstats/nseloser/index.php"
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            rows = soup.select('div.bsr_table table tbody tr')
-            
-            for row in rows[:10]:
-                cols = row.find_all('td')
-                if len(cols) >= 7:
-                    losers.append({
-                        'symbol': cols[0].text.strip(),
-                        'name': cols[1].text.strip(),
-                        'price': float(cols[3].text.replace(',', '').strip()),
-                        'change': float(cols[4].text.replace(',', '').strip()),
-                        'change_percent': float(cols[5].text.replace('%', '').strip()),
-                        'volume': safe_int(cols[6].text),
-                        'source': 'MoneyControl'
-                    })
-    
-    except Exception as e:
-        print(f"Error fetching MoneyControl data: {str(e)}")
-    
-    return gainers, losers
+    return sources.fetch(['MoneyControl']).get('MoneyControl', ([], []))
 
-def get_market_movers(limit: int = 10) -> Tuple[List[Dict], List[Dict]]:
-    """Get top gainers and losers from multiple sources"""
+
+def merge_movers(results: List[Tuple[List[Dict], List[Dict]]], limit: int) -> Tuple[List[Dict], List[Dict]]:
+    """Combine per-source lists, sort by change percentage and drop duplicate symbols."""
     all_gainers = []
     all_losers = []
-    
-    # Get data from Screener.in
-    screener_gainers, screener_losers = get_screener_data()
-    all_gainers.extend(screener_gainers)
-    all_losers.extend(screener_losers)
-    
-    # Add delay between requests
-    time.sleep(1)
-    
-    # Get data from MoneyControl
-    mc_gainers, mc_losers = get_moneycontrol_data()
-    all_gainers.extend(mc_gainers)
-    all_losers.extend(mc_losers)
-    
+    for gainers, losers in results:
+        all_gainers.extend(gainers)
+        all_losers.extend(losers)
+
     # Sort by change percentage
     all_gainers.sort(key=lambda x: x['change_percent'], reverse=True)
     all_losers.sort(key=lambda x: x['change_percent'])
-    
+
     # Remove duplicates while preserving order
     def get_unique_stocks(stocks):
         seen = set()
@@ -151,11 +36,15 @@ def get_market_movers(limit: int = 10) -> Tuple[List[Dict], List[Dict]]:
                 seen.add(stock['symbol'])
                 unique_stocks.append(stock)
         return unique_stocks[:limit]
-    
-    unique_gainers = get_unique_stocks(all_gainers)
-    unique_losers = get_unique_stocks(all_losers)
-    
-    return unique_gainers, unique_losers
+
+    return get_unique_stocks(all_gainers), get_unique_stocks(all_losers)
+
+
+def get_market_movers(limit: int = 10) -> Tuple[List[Dict], List[Dict]]:
+    """Get top gainers and losers from multiple sources"""
+    # Healthy sources are fetched at once; slow ones are dropped at the deadline
+    results = sources.fetch(HOME_SOURCES)
+    return merge_movers(list(results.values()), limit)
 
 def format_large_number(num: float) -> str:
     """Format large numbers into K, M, B format"""
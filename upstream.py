@@ -0,0 +1,204 @@
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple, Type
+
+import requests
+
+# A host failing this many calls in a row is cut off for UPSTREAM_COOLDOWN seconds,
+# doubling with each failed probe up to MAX_COOLDOWN
+FAILURE_THRESHOLD = int(os.getenv('UPSTREAM_FAILURE_THRESHOLD', 5))
+COOLDOWN = float(os.getenv('UPSTREAM_COOLDOWN', 30))
+MAX_COOLDOWN = 600.0
+
+# Background retries: attempts per key, and the base of their jittered exponential backoff
+RETRY_ATTEMPTS = 3
+RETRY_DELAY = 2.0
+MAX_RETRY_DELAY = 60.0
+
+
+class CircuitOpen(requests.exceptions.ConnectionError):
+    """The host has been failing; the call was refused without touching the network."""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f'{host} is unavailable; retry in {retry_after:.0f}s')
+        self.host = host
+        self.retry_after = retry_after
+
+    def __reduce__(self):
+        # Keeps the exception intact when it is raised in an inference worker process
+        return CircuitOpen, (self.host, self.retry_after)
+
+
+class Breaker:
+    """Health of one upstream host across every caller in this process."""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.last_error: Optional[str] = None
+        self.last_failure: Optional[float] = None
+
+    def state(self, now: float) -> str:
+        # open_until is also set, below the threshold, by a Retry-After from the host
+        if now < self.open_until:
+            return 'open'
+        return 'closed' if self.consecutive_failures < FAILURE_THRESHOLD else 'half-open'
+
+    def info(self, now: float) -> Dict[str, Any]:
+        state = self.state(now)
+        return {
+            'state': state,
+            'successes': self.successes,
+            'failures': self.failures,
+            'rejected': self.rejected,
+            'consecutive_failures': self.consecutive_failures,
+            'retry_after': round(self.open_until - now, 1) if state == 'open' else 0,
+            'last_error': self.last_error,
+            'last_failure_age': round(now - self.last_failure, 1) if self.last_failure else None,
+        }
+
+
+class UpstreamPolicy:
+    """Per-host circuit breaking and background retries for calls to third-party services.
+
+    Request threads make at most one attempt: when a host is failing they get
+    CircuitOpen straight away instead of waiting on timeouts, and retries run later on
+    timer threads with jittered backoff, so nothing sleeps while holding a worker.
+    """
+
+    def __init__(self):
+        self._breakers: Dict[str, Breaker] = {}
+        self._retrying: Set[Hashable] = set()
+        self._lock = threading.Lock()
+        self.retries = {'scheduled': 0, 'succeeded': 0, 'abandoned': 0}
+
+    def _breaker(self, host: str) -> Breaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers.setdefault(host, Breaker(host))
+        return breaker
+
+    def check(self, host: str) -> None:
+        """Raise CircuitOpen unless a call to `host` may go ahead.
+
+        Once the cooldown has passed, a single caller is let through as a probe;
+        the rest keep failing fast until it reports back.
+        """
+        now = time.time()
+        with self._lock:
+            breaker = self._breaker(host)
+            state = breaker.state(now)
+            if state == 'closed' or (state == 'half-open' and not breaker.probing):
+                breaker.probing = state == 'half-open'
+                return
+            breaker.rejected += 1
+            raise CircuitOpen(host, max(1.0, breaker.open_until - now))
+
+    def record(self, host: str, error: Optional[str] = None, retry_after: Optional[float] = None) -> None:
+        """Report the outcome of a call that `check` let through.
+
+        A failure carrying `retry_after` (the host's Retry-After) fails calls fast for at
+        least that long, even below the failure threshold.
+        """
+        now = time.time()
+        with self._lock:
+            breaker = self._breaker(host)
+            breaker.probing = False
+            if error is None:
+                breaker.successes += 1
+                breaker.consecutive_failures = 0
+                breaker.open_until = 0.0
+                return
+            breaker.failures += 1
+            breaker.consecutive_failures += 1
+            breaker.last_error = error
+            breaker.last_failure = now
+            excess = breaker.consecutive_failures - FAILURE_THRESHOLD
+            if excess >= 0:
+                breaker.open_until = now + min(MAX_COOLDOWN, COOLDOWN * 2 ** excess)
+            if retry_after:
+                breaker.open_until = max(breaker.open_until, now + min(MAX_COOLDOWN, retry_after))
+            if breaker.open_until > now:
+                logging.warning(f'Upstream {host} failed {breaker.consecutive_failures} times in a row '
+                                f'({error}); failing fast for {breaker.open_until - now:.0f}s')
+
+    def call(self, host: str, fn: Callable[[], Any],
+             expected: Tuple[Type[BaseException], ...] = ()) -> Any:
+        """Run `fn` once under `host`'s breaker.
+
+        Exceptions in `expected` are answers from a healthy host (an unknown symbol,
+        say) and do not count as failures.
+        """
+        self.check(host)
+        try:
+            result = fn()
+        except expected:
+            self.record(host)
+            raise
+        except Exception as e:
+            self.record(host, f'{type(e).__name__}: {e}')
+            raise
+        self.record(host)
+        return result
+
+    def retry_later(self, host: str, key: Hashable, fn: Callable[[], Any],
+                    attempts: int = RETRY_ATTEMPTS) -> bool:
+        """Retry `fn` in the background until it succeeds, `attempts` run out or `host` is cut off.
+
+        One retry chain per `key`; returns False if one is already pending.
+        """
+        with self._lock:
+            if key in self._retrying:
+                return False
+            self._retrying.add(key)
+            self.retries['scheduled'] += 1
+        self._schedule(host, key, fn, 0, attempts)
+        return True
+
+    def _schedule(self, host: str, key: Hashable, fn: Callable[[], Any], attempt: int, attempts: int) -> None:
+        # Half fixed, half random, so retries from many keys do not land on the host together
+        base = min(MAX_RETRY_DELAY, RETRY_DELAY * 2 ** attempt)
+        delay = base / 2 + random.uniform(0, base / 2)
+        with self._lock:
+            # Never sooner than the host's cooldown or Retry-After, which would only be refused
+            delay = max(delay, self._breaker(host).open_until - time.time() + random.uniform(0, 1))
+        timer = threading.Timer(delay, self._retry, (host, key, fn, attempt, attempts))
+        timer.daemon = True
+        timer.start()
+
+    def _retry(self, host: str, key: Hashable, fn: Callable[[], Any], attempt: int, attempts: int) -> None:
+        try:
+            fn()
+            outcome = 'succeeded'
+        except CircuitOpen as e:
+            logging.warning(f'Giving up retrying {key}: {e}')
+            outcome = 'abandoned'
+        except Exception as e:
+            if attempt + 1 < attempts:
+                logging.info(f'Retry {attempt + 1}/{attempts} of {key} failed: {e}')
+                self._schedule(host, key, fn, attempt + 1, attempts)
+                return
+            logging.warning(f'Giving up retrying {key} after {attempts} attempts: {e}')
+            outcome = 'abandoned'
+        with self._lock:
+            self._retrying.discard(key)
+            self.retries[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            return {
+                'hosts': {host: breaker.info(now) for host, breaker in self._breakers.items()},
+                'retries': dict(self.retries, pending=len(self._retrying)),
+            }
+
+
+upstream = UpstreamPolicy()
@@ -0,0 +1,55 @@
+"""
+Native XGBoost Booster for `model/xgb_model.pkl`.
+
+The pickled `XGBRegressor` is exported once to XGBoost's own UBJSON format, which loads
+without unpickling and is stable across xgboost releases.
+
+Usage:
+    python xgb_native.py [model/xgb_model.pkl] [model/xgb_model.ubj]
+"""
+
+import os
+import sys
+
+import numpy as np
+import xgboost as xgb
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model')
+XGB_PKL_PATH = os.path.join(MODEL_DIR, 'xgb_model.pkl')
+XGB_UBJ_PATH = os.path.join(MODEL_DIR, 'xgb_model.ubj')
+
+
+def export_booster(pkl_path: str = XGB_PKL_PATH, out_path: str = XGB_UBJ_PATH) -> None:
+    """Save the Booster inside the pickled regressor; the extension picks UBJSON or JSON."""
+    import joblib
+
+    joblib.load(pkl_path).get_booster().save_model(out_path)
+
+
+class NativeXGB:
+    """Booster scored with `inplace_predict`, skipping the per-call DMatrix."""
+
+    def __init__(self, path: str = XGB_UBJ_PATH):
+        self.booster = xgb.Booster()
+        self.booster.load_model(path)
+        self.booster.set_param({'nthread': 1})
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Score a `(k, n_features)` batch of rows."""
+        rows = np.ascontiguousarray(X, dtype=np.float32)
+        return self.booster.inplace_predict(rows, validate_features=False)
+
+
+def load_xgb(path: str):
+    """Registry loader: native Booster for `.ubj`/`.json`, the sklearn pickle otherwise."""
+    if path.endswith(('.ubj', '.json')):
+        return NativeXGB(path)
+    import joblib
+    return joblib.load(path)
+
+
+if __name__ == '__main__':
+    src = sys.argv[1] if len(sys.argv) > 1 else XGB_PKL_PATH
+    dst = sys.argv[2] if len(sys.argv) > 2 else XGB_UBJ_PATH
+    export_booster(src, dst)
+    print(f'Exported booster from {src} to {dst}')